@@ -0,0 +1,167 @@
+"""
+ASGI-вход для WSGI-приложения.
+
+Django 2.2 не умеет ни ASGI, ни асинхронных представлений, а ORM
+у него только синхронный. Поэтому каждый запрос целиком выполняет
+обычное WSGI-приложение в пуле потоков ограниченного размера.
+Event loop сервера (uvicorn, daphne) держит соединения и медленных
+клиентов, не занимая потоков, а работают одновременно не больше
+max_workers запросов. Столько же потоков и соединений с БД было бы
+у WSGI-сервера с тем же объёмом памяти.
+
+Тело запроса читается целиком до передачи в поток: до spool_size
+байт в памяти, дальше во временном файле. Тело больше max_body_size
+получает ответ 413, не дочитываясь. Если клиент отключился, не
+дослав тело, запрос не выполняется: обрезанная форма или загрузка
+дошла бы до представления как целая. Ответ отдаётся одним
+сообщением после того, как WSGI-приложение его вернуло.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Сколько байт тела держать в памяти, как FILE_UPLOAD_MAX_MEMORY_SIZE.
+SPOOL_SIZE = 2621440
+TOO_LARGE = 413
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def build_environ(scope, body):
+    """WSGI environ по HTTP-scope ASGI и файлу с телом запроса."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': (scope.get('client') or ('127.0.0.1', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            # HTTP/2 делит Cookie на несколько заголовков.
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = environ[name] + separator + value
+        environ[name] = value
+    return environ
+
+
+def call_wsgi(application, environ):
+    """Выполняет WSGI-приложение: (код ответа, заголовки, тело)."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    result = application(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        # Django закрывает соединения с БД по request_finished,
+        # поэтому close() вызывается в том же потоке.
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+class WsgiToAsgi:
+    def __init__(self, wsgi_application, max_workers, max_body_size=None,
+                 spool_size=SPOOL_SIZE):
+        self.wsgi_application = wsgi_application
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError('Поддерживается только HTTP: %s' % scope['type'])
+        try:
+            body = await self.read_body(scope, receive)
+        except ClientDisconnected:
+            return
+        if body is None:
+            status, headers, content = (
+                TOO_LARGE, [(b'content-type', b'text/plain')],
+                b'Request body too large')
+        else:
+            loop = asyncio.get_running_loop()
+            status, headers, content = await loop.run_in_executor(
+                self.executor, self.handle, scope, body)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    def handle(self, scope, body):
+        try:
+            return call_wsgi(
+                self.wsgi_application, build_environ(scope, body))
+        finally:
+            body.close()
+
+    def too_large(self, size):
+        return self.max_body_size is not None and size > self.max_body_size
+
+    async def read_body(self, scope, receive):
+        """
+        Файл с телом запроса или None, если тело больше предела.
+        Отключение клиента до конца тела — ClientDisconnected.
+        """
+        for name, value in scope.get('headers', []):
+            if (name.lower() == b'content-length' and value.isdigit()
+                    and self.too_large(int(value))):
+                return None
+        body = tempfile.SpooledTemporaryFile(self.spool_size)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                raise ClientDisconnected
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.too_large(size):
+                body.close()
+                return None
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
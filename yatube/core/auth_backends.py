@@ -0,0 +1,35 @@
+"""
+Бэкенд аутентификации с пользователем в кеше.
+
+AuthenticationMiddleware на каждом запросе достаёт пользователя
+по id из сессии. Здесь он берётся из кеша на AUTH_USER_CACHE_TIMEOUT
+секунд, а сигналы core.signals сбрасывают запись при любом save()
+и удалении пользователя, в том числе при смене пароля: иначе хеш
+сессии сверялся бы со старым паролем. Правки мимо сигналов
+(update()) видны после истечения срока.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+KEY_PREFIX = 'auth:user:'
+
+
+def cache_key(user_id):
+    return f'{KEY_PREFIX}{user_id}'
+
+
+def forget(user_id):
+    cache.delete(cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
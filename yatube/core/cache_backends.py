@@ -0,0 +1,57 @@
+import fcntl
+import os
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Ключи блокируются через постоянный набор файлов: файл на каждый
+# ключ копился бы в каталоге и после удаления ключей.
+LOCK_STRIPES = 64
+
+
+class SharedFileCache(FileBasedCache):
+    """
+    Файловый кеш, общий для всех процессов на одной машине.
+    add() и incr() выполняются под блокировкой одного из LOCK_STRIPES
+    файлов, выбранного по ключу, поэтому на них можно строить
+    межпроцессные блокировки и счётчики.
+    """
+
+    def _lock_file(self, key, version=None):
+        name = os.path.basename(self._key_to_file(key, version))
+        stripe = zlib.crc32(name.encode()) % LOCK_STRIPES
+        return os.path.join(self._dir, 'stripe-%02d.lock' % stripe)
+
+    @contextmanager
+    def _locked(self, key, version=None):
+        self._createdir()
+        with open(self._lock_file(key, version), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        # BaseCache.incr перезаписал бы ключ с таймаутом по умолчанию.
+        with self._locked(key, version):
+            try:
+                with open(self._key_to_file(key, version), 'rb') as f:
+                    expiry = pickle.load(f)
+                    if expiry is not None and expiry < time.time():
+                        raise ValueError("Key '%s' not found" % key)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except FileNotFoundError:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            timeout = None if expiry is None else expiry - time.time()
+            self.set(key, value, timeout, version)
+            return value
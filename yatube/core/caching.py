@@ -0,0 +1,78 @@
+"""
+Защита кеша от лавины запросов.
+
+get_or_refresh: значение хранится со сроком свежести и живёт в кеше
+ещё CACHE_STALE_TIMEOUT секунд после него. Устаревшее значение
+пересчитывает один запрос, взявший блокировку через cache.add(),
+остальные в это время получают старое. При полном промахе без
+блокировки запрос недолго ждёт результат того, кто считает.
+
+get_or_compute_early: вероятностный досрочный пересчёт (XFetch).
+Чем ближе срок и чем дольше считается значение, тем вероятнее
+запрос пересчитает его заранее, и до массового промаха не доходит.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+LOCK_SUFFIX = ':lock'
+WAIT_STEP = 0.05
+
+
+def get_or_refresh(key, compute, timeout, cache=None):
+    cache = cache or default_cache
+    cached = cache.get(key)
+    if cached is not None:
+        value, fresh_until = cached
+        if time.time() < fresh_until or not acquire(cache, key):
+            return value
+        return refresh(cache, key, compute, timeout)
+    if acquire(cache, key):
+        return refresh(cache, key, compute, timeout)
+    deadline = time.time() + settings.CACHE_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0]
+    return compute()
+
+
+def acquire(cache, key):
+    return cache.add(key + LOCK_SUFFIX, 1, settings.CACHE_LOCK_TIMEOUT)
+
+
+def refresh(cache, key, compute, timeout):
+    try:
+        value = compute()
+        cache.set(
+            key, (value, time.time() + timeout),
+            timeout + settings.CACHE_STALE_TIMEOUT)
+        return value
+    finally:
+        cache.delete(key + LOCK_SUFFIX)
+
+
+def get_or_compute_early(key, compute, timeout, beta=1.0, cache=None):
+    cache = cache or default_cache
+    cached = cache.get(key)
+    if cached is not None:
+        value, delta, expiry = cached
+        early = delta * beta * math.log(1 - random.random())
+        if time.time() - early < expiry:
+            return value
+    return compute_and_store(key, compute, timeout, cache)
+
+
+def compute_and_store(key, compute, timeout, cache=None):
+    """Пересчитывает значение для get_or_compute_early и кладёт в кеш."""
+    cache = cache or default_cache
+    started = time.time()
+    value = compute()
+    finished = time.time()
+    cache.set(
+        key, (value, finished - started, finished + timeout), timeout)
+    return value
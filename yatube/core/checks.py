@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register('database')
+def pool_size_check(app_configs, **kwargs):
+    """Пул соединений меньше числа потоков yatube.asgi заставит их ждать."""
+    threads = getattr(settings, 'ASGI_THREADS', 0)
+    return [
+        Warning(
+            f'POOL_MAX_SIZE базы {alias} ({database["POOL_MAX_SIZE"]}) '
+            f'меньше ASGI_THREADS ({threads}).',
+            hint='Увеличьте YATUBE_DB_POOL_SIZE или уменьшите '
+                 'YATUBE_ASGI_THREADS: лишние потоки ждут соединение '
+                 'POOL_TIMEOUT секунд и падают с ошибкой базы.',
+            id='core.W001',
+        )
+        for alias, database in settings.DATABASES.items()
+        if database.get('POOL_MAX_SIZE', threads) < threads
+    ]
@@ -0,0 +1,99 @@
+"""
+PostgreSQL с пулом соединений psycopg2.
+
+Закрытие соединения Django (конец запроса, истёкший CONN_MAX_AGE)
+возвращает его в общий для процесса пул, а новое соединение берётся
+из пула. Размер пула задают POOL_MIN_SIZE и POOL_MAX_SIZE в настройках
+базы. С CONN_MAX_AGE каждый поток держит своё соединение, поэтому
+потоков больше POOL_MAX_SIZE ждут, пока соединение вернут в пул,
+не дольше POOL_TIMEOUT секунд, и только потом получают ошибку.
+"""
+import threading
+
+from django.db.backends.postgresql.base import \
+    DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.db.backends.postgresql.creation import \
+    DatabaseCreation as PostgreSQLDatabaseCreation
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool, который при занятых maxconn соединениях
+    ждёт свободного до timeout секунд, а не сразу поднимает PoolError.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=30, **kwargs):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(
+                f'Нет свободного соединения за {self.timeout} с')
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+
+def get_pool(conn_params, min_size, max_size, timeout):
+    key = tuple(sorted(conn_params.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = BlockingConnectionPool(
+                min_size, max_size, timeout=timeout, **conn_params)
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+class DatabaseCreation(PostgreSQLDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Соединения в пуле не дали бы удалить тестовую базу.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(
+            conn_params,
+            self.settings_dict.get('POOL_MIN_SIZE', 1),
+            self.settings_dict.get('POOL_MAX_SIZE', 20),
+            self.settings_dict.get('POOL_TIMEOUT', 30),
+        )
+        connection = self.pool.getconn()
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is not None:
+            self.isolation_level = isolation_level
+            if connection.isolation_level != isolation_level:
+                connection.set_session(isolation_level=isolation_level)
+        else:
+            self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # putconn откатывает незавершённую транзакцию,
+            # а оборванное соединение закрывает.
+            self.pool.putconn(self.connection)
@@ -0,0 +1,31 @@
+"""
+SQLite с настройками для одиночной установки.
+
+PRAGMAS из настроек базы выполняются на каждом новом соединении:
+WAL не блокирует читателей во время записи, synchronous=NORMAL
+в режиме WAL безопасен и не ждёт fsync на каждой транзакции,
+mmap_size читает файл базы через отображение в память, cache_size
+задаёт кеш страниц (отрицательное значение — в КиБ), busy_timeout —
+сколько миллисекунд ждать чужую блокировку записи, temp_store=MEMORY
+держит временные таблицы и сортировки в памяти.
+"""
+from django.db.backends.sqlite3.base import \
+    DatabaseWrapper as SQLiteDatabaseWrapper
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {**DEFAULT_PRAGMAS, **self.settings_dict.get('PRAGMAS', {})}
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
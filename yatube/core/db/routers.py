@@ -0,0 +1,119 @@
+"""
+Маршрутизация чтения на реплики.
+
+Представления лент помечаются декоратором read_only: чтения внутри
+них уходят в одну из баз DATABASE_REPLICAS. Для SQLite это второе
+соединение с тем же файлом в режиме query_only, для PostgreSQL —
+реплики. Запись всегда идёт в default.
+
+Запрос с небезопасным методом (POST и т. п.), который что-то записал,
+дальше читает из default, а PrimaryPinMiddleware ещё REPLICA_PIN_SECONDS
+секунд отправляет туда же чтения этого браузера: отставшая реплика
+не спрячет от пользователя его собственный пост. Служебные записи
+GET-запросов (очередь миниатюр, счётчики) браузер не привязывают.
+
+Реплика выбирается одна на запрос, чтобы страница не собиралась
+из реплик с разным отставанием.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_local = threading.local()
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def in_read_only():
+    return getattr(_local, 'depth', 0) > 0
+
+
+def pinned_to_primary():
+    return (getattr(_local, 'pinned', False)
+            or getattr(_local, 'wrote', False))
+
+
+@contextmanager
+def read_only_block():
+    _local.depth = getattr(_local, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+def read_only(view):
+    """Чтения представления идут в реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        with read_only_block():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+
+    @property
+    def wrote(self):
+        return getattr(_local, 'wrote', False)
+
+
+@contextmanager
+def request_scope(pinned=False, unsafe=False):
+    """
+    Состояние маршрутизации одного запроса. Записи отмечаются
+    только в запросах с небезопасным методом (unsafe).
+    """
+    _local.in_request = True
+    _local.unsafe = unsafe
+    _local.pinned = pinned
+    _local.wrote = False
+    _local.replica = None
+    try:
+        yield RequestState(pinned)
+    finally:
+        _local.in_request = False
+        _local.unsafe = False
+        _local.pinned = False
+        _local.wrote = False
+        _local.replica = None
+
+
+def replicas():
+    return [
+        alias for alias in getattr(settings, 'DATABASE_REPLICAS', [])
+        if alias in settings.DATABASES
+    ]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not in_read_only() or pinned_to_primary():
+            return None
+        aliases = replicas()
+        if not aliases:
+            return None
+        if not getattr(_local, 'in_request', False):
+            return random.choice(aliases)
+        if _local.replica not in aliases:
+            _local.replica = random.choice(aliases)
+        return _local.replica
+
+    def db_for_write(self, model, **hints):
+        if getattr(_local, 'unsafe', False):
+            _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
@@ -0,0 +1,201 @@
+"""
+Фоновая уборка базы: просроченные сессии, осиротевшие записи
+kvstore sorl-thumbnail, VACUUM и ANALYZE.
+
+Удаление идёт пачками по batch_size строк, каждая пачка в своей
+короткой транзакции, между пачками пауза: на SQLite запись блокирует
+всю базу, и запросы сайта проходят в промежутках. Каждая задача
+возвращает TaskReport: сколько строк убрано, с какой скоростью
+и сколько времени держалась блокировка записи.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from django.contrib.sessions.models import Session
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+logger = logging.getLogger('yatube.metrics')
+
+# SQLite переписывает файл базы при VACUUM целиком, поэтому он
+# запускается, только когда свободные страницы занимают эту долю.
+VACUUM_FREE_RATIO = 0.2
+
+
+class TaskReport:
+    def __init__(self, task):
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished = None
+        self.rows = 0
+        self.batches = 0
+        self.lock_time = 0.0
+        self.max_lock_time = 0.0
+
+    @contextmanager
+    def lock(self):
+        """Учитывает время одной записывающей транзакции."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.batches += 1
+            self.lock_time += elapsed
+            self.max_lock_time = max(self.max_lock_time, elapsed)
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        return self
+
+    @property
+    def total_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self):
+        total_time = self.total_time
+        return {
+            'task': self.task,
+            'rows': self.rows,
+            'batches': self.batches,
+            'seconds': round(total_time, 3),
+            'rows_per_second': round(self.rows / total_time, 1)
+            if total_time else 0.0,
+            'lock_ms': round(self.lock_time * 1000, 2),
+            'max_lock_ms': round(self.max_lock_time * 1000, 2),
+        }
+
+
+def delete_in_batches(queryset, report, batch_size, pause):
+    model = queryset.model
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        with report.lock(), transaction.atomic():
+            deleted, _ = model._base_manager.filter(pk__in=pks).delete()
+        report.rows += deleted
+        if len(pks) < batch_size:
+            return
+        time.sleep(pause)
+
+
+def clear_sessions(batch_size, pause):
+    """Просроченные сессии. Сессии в cookie в базе не лежат."""
+    report = TaskReport('sessions')
+    delete_in_batches(
+        Session.objects.filter(expire_date__lt=timezone.now()),
+        report, batch_size, pause)
+    return report.finish()
+
+
+def kvstore_batches(identity, batch_size):
+    """Записи kvstore с префиксом identity пачками по возрастанию ключа."""
+    prefix = add_prefix('', identity)
+    last = prefix
+    while True:
+        rows = list(
+            KVStore.objects
+            .filter(key__startswith=prefix, key__gt=last)
+            .order_by('key')
+            .values_list('key', 'value')[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def clear_thumbnails(batch_size, pause):
+    """
+    То же, что thumbnail cleanup, но пачками: записи картинок, чьих
+    файлов уже нет, и ссылки на них из списков миниатюр.
+    """
+    report = TaskReport('thumbnails')
+    kvstore = default.kvstore
+    for rows in kvstore_batches('image', batch_size):
+        missing = [
+            image_file for image_file in (
+                deserialize_image_file(value) for key, value in rows)
+            if not image_file.exists()
+        ]
+        if missing:
+            with report.lock(), transaction.atomic():
+                for image_file in missing:
+                    kvstore.delete(image_file)
+            report.rows += len(missing)
+            time.sleep(pause)
+    for rows in kvstore_batches('thumbnails', batch_size):
+        lists = {del_prefix(key): deserialize(value) for key, value in rows}
+        wanted = set(lists).union(*lists.values())
+        present = {
+            del_prefix(key) for key in KVStore.objects.filter(
+                key__in=[add_prefix(key) for key in wanted],
+            ).values_list('key', flat=True)
+        }
+        changed = {
+            key: [thumbnail for thumbnail in thumbnails
+                  if thumbnail in present] if key in present else []
+            for key, thumbnails in lists.items()
+        }
+        changed = {
+            key: thumbnails for key, thumbnails in changed.items()
+            if thumbnails != lists[key]
+        }
+        if changed:
+            with report.lock(), transaction.atomic():
+                for key, thumbnails in changed.items():
+                    if thumbnails:
+                        kvstore._set(key, thumbnails, identity='thumbnails')
+                    else:
+                        kvstore._delete(key, identity='thumbnails')
+            report.rows += len(changed)
+            time.sleep(pause)
+    return report.finish()
+
+
+def vacuum(using=DEFAULT_DB_ALIAS):
+    """
+    ANALYZE обновляет статистику планировщика. VACUUM возвращает
+    место после удалений, на SQLite — только при VACUUM_FREE_RATIO
+    свободных страниц. В rows отчёта — освобождённые страницы.
+    """
+    report = TaskReport('vacuum')
+    connection = connections[using]
+    with report.lock(), connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA page_count')
+            pages = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            free = cursor.fetchone()[0]
+            if pages and free / pages >= VACUUM_FREE_RATIO:
+                cursor.execute('VACUUM')
+                report.rows = free
+            cursor.execute('ANALYZE')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('VACUUM ANALYZE')
+    return report.finish()
+
+
+TASKS = {
+    'sessions': clear_sessions,
+    'thumbnails': clear_thumbnails,
+    'vacuum': lambda batch_size, pause: vacuum(),
+}
+
+
+def run(tasks=tuple(TASKS), batch_size=1000, pause=0.1):
+    """Выполняет задачи по порядку и пишет отчёты в yatube.metrics."""
+    reports = []
+    for task in tasks:
+        report = TASKS[task](batch_size, pause)
+        logger.info(json.dumps(
+            {'maintenance': report.as_dict()}, ensure_ascii=False))
+        reports.append(report)
+    return reports
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import maintenance
+
+
+class Command(BaseCommand):
+    help = ('Удаляет просроченные сессии и осиротевшие записи '
+            'kvstore миниатюр, выполняет VACUUM и ANALYZE.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task', action='append', dest='tasks',
+            choices=list(maintenance.TASKS),
+            help='Задача; можно повторять. По умолчанию все.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк удалять одной транзакцией.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Пауза между пачками, секунды.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Повторять уборку каждые --interval секунд.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=60 * 60,
+            help='Пауза между прогонами в режиме --loop, секунды.'
+        )
+
+    def handle(self, *args, tasks=None, batch_size=1000, pause=0.1,
+               loop=False, interval=3600, **options):
+        tasks = tasks or list(maintenance.TASKS)
+        while True:
+            for report in maintenance.run(tasks, batch_size, pause):
+                self.write_report(report.as_dict())
+            if not loop:
+                return
+            # Процесс живёт долго: соединение не держится между прогонами.
+            connections.close_all()
+            time.sleep(interval)
+
+    def write_report(self, report):
+        self.stdout.write(
+            '{task}: {rows} за {seconds} с ({rows_per_second}/с), '
+            'пачек {batches}, блокировка {lock_ms} мс, '
+            'максимум {max_lock_ms} мс'.format(**report))
@@ -0,0 +1,147 @@
+"""
+Метрики запроса: SQL-запросы и время БД, рендер шаблонов, кеш.
+
+Данные копятся в RequestMetrics текущего потока, пока его запрос
+обрабатывает core.middleware.RequestMetricsMiddleware.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+    def server_timing(self):
+        return ', '.join((
+            'db;dur=%.2f;desc="%d queries"' % (
+                self.db_time * 1000, self.queries),
+            'tpl;dur=%.2f' % (self.template_time * 1000),
+            'cache;desc="hits %d misses %d"' % (
+                self.cache_hits, self.cache_misses),
+            'total;dur=%.2f' % (self.total_time * 1000),
+        ))
+
+
+def current():
+    """Метрики запроса текущего потока или None вне запроса."""
+    return getattr(_local, 'metrics', None)
+
+
+def _query_timer(execute, sql, params, many, context):
+    metrics = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def template_timer():
+    """Учитывает время рендера только внешнего шаблона."""
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+def _count(hits, misses):
+    metrics = current()
+    # BaseCache.get_many зовёт get() по ключам, их не считаем дважды.
+    if metrics is not None and not getattr(_local, 'in_get_many', False):
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def _count_get(get):
+    def wrapper(key, default=None, *args, **kwargs):
+        sentinel = object()
+        value = get(key, sentinel, *args, **kwargs)
+        if value is sentinel:
+            _count(0, 1)
+            return default
+        _count(1, 0)
+        return value
+    return wrapper
+
+
+def _count_get_many(get_many):
+    def wrapper(keys, *args, **kwargs):
+        keys = list(keys)
+        _local.in_get_many = True
+        try:
+            found = get_many(keys, *args, **kwargs)
+        finally:
+            _local.in_get_many = False
+        _count(len(found), len(keys) - len(found))
+        return found
+    return wrapper
+
+
+def instrument_caches():
+    """
+    Оборачивает get/get_many у кешей потока.
+    Экземпляры кешей в Django свои у каждого потока,
+    поэтому обёртка ставится один раз на поток.
+    """
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if getattr(cache, '_metrics_instrumented', False):
+            continue
+        cache.get = _count_get(cache.get)
+        cache.get_many = _count_get_many(cache.get_many)
+        cache._metrics_instrumented = True
+
+
+@contextmanager
+def collect():
+    """Собирает метрики всего, что выполняется внутри блока."""
+    instrument_caches()
+    metrics = RequestMetrics()
+    _local.metrics = metrics
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_query_timer))
+            yield metrics
+    finally:
+        _local.metrics = None
@@ -0,0 +1,147 @@
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language_from_request
+
+from core import metrics, page_cache
+from core.db import routers
+
+logger = logging.getLogger('yatube.metrics')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetricsMiddleware:
+    """
+    Считает для каждого запроса SQL-запросы, время БД, время рендера
+    шаблонов и попадания в кеш. Отдаёт их в заголовке Server-Timing
+    и одной JSON-строкой в лог yatube.metrics.
+
+    QUERY_BUDGETS задаёт предельное число запросов для представления
+    по его имени ('posts:index'). При превышении пишется предупреждение,
+    а с QUERY_BUDGET_STRICT = True (его включает manage.py test)
+    поднимается исключение.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.collect() as request_metrics:
+            response = self.get_response(request)
+        response['Server-Timing'] = request_metrics.server_timing()
+        view_name = getattr(request.resolver_match, 'view_name', None)
+        record = {
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **request_metrics.as_dict(),
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+        self.check_budget(view_name, request_metrics.queries)
+        return response
+
+    def check_budget(self, view_name, queries):
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is None or queries <= budget:
+            return
+        message = (
+            f'{view_name}: {queries} SQL-запросов при бюджете {budget}')
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class PrimaryPinMiddleware:
+    """
+    После небезопасного запроса с записью ставит подписанную куку:
+    пока она жива (REPLICA_PIN_SECONDS), чтения этого браузера идут
+    в default.
+    """
+    cookie_name = 'primary_pin'
+    salt = 'core.middleware.PrimaryPinMiddleware'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        scope = routers.request_scope(
+            pinned=self.pinned(request),
+            unsafe=request.method not in routers.SAFE_METHODS)
+        with scope as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote and routers.replicas():
+            response.set_signed_cookie(
+                self.cookie_name, '1', salt=self.salt,
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax')
+        return response
+
+    def pinned(self, request):
+        return request.get_signed_cookie(
+            self.cookie_name, default=None, salt=self.salt,
+            max_age=settings.REPLICA_PIN_SECONDS) is not None
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Отдаёт анонимным GET-запросам к представлениям PAGE_CACHE_VIEWS
+    готовые страницы из кеша, не доходя до сессий, авторизации и БД.
+
+    Запросы с кукой сессии, CSRF или сообщений идут в представление:
+    для них страница может отличаться. Ответ с Set-Cookie не кешируется.
+    Ключ зависит от языка и полного пути с параметрами, сбрасывается
+    сигналами моделей по области страницы (core.page_cache.bump).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = self.cache_key(request)
+        if key is None:
+            return self.get_response(request)
+        response = cache.get(key)
+        if response is not None:
+            response['X-Page-Cache'] = 'hit'
+            return response
+        response = self.get_response(request)
+        patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+        if request.method == 'GET' and self.cacheable(response):
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        return response
+
+    def bypass_cookies(self):
+        return (settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME,
+                CookieStorage.cookie_name)
+
+    def cache_key(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if any(name in request.COOKIES for name in self.bypass_cookies()):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        scope = settings.PAGE_CACHE_VIEWS.get(match.view_name)
+        if scope is None:
+            return None
+        return page_cache.page_key(
+            request.get_full_path(), get_language_from_request(request),
+            scope.format(**match.kwargs))
+
+    def cacheable(self, response):
+        return (response.status_code == 200
+                and not response.streaming
+                and not response.cookies)
@@ -0,0 +1,56 @@
+"""
+Кеш целых страниц для анонимных посетителей.
+
+Ключ страницы содержит поколения двух областей: общей для всего
+сайта (SITE) и своей области страницы — ленты (FEED), автора или
+поста, см. PAGE_CACHE_VIEWS. Сигналы моделей меняют поколения
+затронутых областей (bump), и их страницы разом становятся
+недостижимы, а старые записи доживают свой PAGE_CACHE_TIMEOUT.
+Комментарий сбрасывает только страницу своего поста, подписка —
+профиль автора. Поколение — случайный токен, а не счётчик, поэтому
+вытесненный из кеша ключ не вернёт старые страницы.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'page-cache:generation'
+SITE = 'site'
+FEED = 'feed'
+
+
+def author(username):
+    return f'author:{username}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def generation_key(scope):
+    return f'{GENERATION_KEY}:{scope}'
+
+
+def generations(*scopes):
+    """Токены поколений областей одним обращением к кешу."""
+    keys = [generation_key(scope) for scope in scopes]
+    tokens = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in tokens}
+    if missing:
+        cache.set_many(missing, None)
+        tokens.update(missing)
+    return ':'.join(tokens[key] for key in keys)
+
+
+def bump(*scopes):
+    """Делает недостижимыми страницы областей, без аргументов — все."""
+    cache.set_many({
+        generation_key(scope): uuid.uuid4().hex
+        for scope in scopes or (SITE,)
+    }, None)
+
+
+def page_key(path, language, scope=FEED):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'page-cache:{generations(SITE, scope)}:{language}:{digest}'
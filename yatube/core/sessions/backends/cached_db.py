@@ -0,0 +1,85 @@
+"""
+Сессии в кеше с отложенной записью в базу.
+
+Чтение как у django cached_db: сначала кеш, при промахе база.
+Запись в кеш идёт сразу, а в базу — в запросе, создавшем сессию
+(вход меняет ключ), и не чаще раза в SESSION_WRITE_BEHIND_SECONDS.
+Правка внутри этого окна помечает сессию несохранённой, и её
+записывает в базу первый запрос после окна, который прочитал или
+сохранил сессию. Пропадёт правка, только если кеш потеряет сессию
+раньше такого запроса. Нужен общий для процессов кеш
+(YATUBE_CACHE=file или redis).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db, db
+from django.contrib.sessions.backends.base import UpdateError
+
+KEY_PREFIX = 'core.sessions.cached_db'
+STATE_SUFFIX = ':state'
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self.created = False
+
+    def create(self):
+        super().create()
+        self.created = True
+
+    def state_key(self, session_key):
+        """Ключ пары (время записи в базу, есть ли несохранённое)."""
+        return self.cache_key_prefix + session_key + STATE_SUFFIX
+
+    def set_state(self, synced_at, pending):
+        self._cache.set(
+            self.state_key(self.session_key), (synced_at, pending),
+            self.get_expiry_age())
+
+    def sync_due(self, state):
+        return (state is None or time.time() - state[0]
+                >= settings.SESSION_WRITE_BEHIND_SECONDS)
+
+    def load(self):
+        state_key = self.state_key(self._get_or_create_session_key())
+        cached = self._cache.get_many([self.cache_key, state_key])
+        data = cached.get(self.cache_key)
+        if data is None:
+            return super().load()
+        state = cached.get(state_key)
+        if state is not None and state[1] and self.sync_due(state):
+            self.write_pending(data)
+        return data
+
+    def write_pending(self, data):
+        self._session_cache = data
+        try:
+            db.SessionStore.save(self)
+        except UpdateError:
+            # Строку из базы успела удалить уборка просроченных.
+            db.SessionStore.save(self, must_create=True)
+        self.set_state(time.time(), False)
+
+    def save(self, must_create=False):
+        if self.session_key is None or must_create or self.created:
+            super().save(must_create=must_create)
+            self.set_state(time.time(), False)
+            return
+        state = self._cache.get(self.state_key(self.session_key))
+        if self.sync_due(state):
+            super().save()
+            self.set_state(time.time(), False)
+            return
+        self._cache.set(
+            self.cache_key, self._get_session(), self.get_expiry_age())
+        self.set_state(state[0], True)
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        if session_key is not None:
+            self._cache.delete(self.state_key(session_key))
+        super().delete(session_key)
@@ -0,0 +1,21 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from core.metrics import template_timer
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with template_timer():
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Обычный движок Django, который учитывает время рендера в метриках."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(
+            self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
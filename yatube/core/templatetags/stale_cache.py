@@ -0,0 +1,50 @@
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Library, TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.caching import get_or_refresh
+
+register = Library()
+
+
+class StaleCacheNode(CacheNode):
+    """
+    Фрагмент кешируется через core.caching.get_or_refresh: после срока
+    его пересчитывает один запрос, остальные получают прежний HTML.
+    """
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time_var.resolve(context))
+        except (VariableDoesNotExist, ValueError, TypeError):
+            raise TemplateSyntaxError(
+                '"cache" tag got an invalid timeout: %r'
+                % self.expire_time_var.var)
+        cache_name = 'default'
+        if self.cache_name:
+            cache_name = self.cache_name.resolve(context)
+        try:
+            fragment_cache = caches[cache_name]
+        except InvalidCacheBackendError:
+            raise TemplateSyntaxError(
+                'Invalid cache name specified for cache tag: %r' % cache_name)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_refresh(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            cache=fragment_cache,
+        )
+
+
+@register.tag('cache')
+def do_stale_cache(parser, token):
+    """
+    {% cache %} с защитой от лавины запросов, синтаксис как у
+    встроенного: {% load stale_cache %}{% cache 20 name var %}.
+    """
+    node = do_cache(parser, token)
+    return StaleCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name)
@@ -0,0 +1,131 @@
+import asyncio
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+
+from core.asgi import WsgiToAsgi, build_environ
+
+
+def echo_application(environ, start_response):
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    return [
+        environ['REQUEST_METHOD'].encode(), b' ',
+        environ['PATH_INFO'].encode('latin-1'), b'?',
+        environ['QUERY_STRING'].encode(), b' ',
+        environ['HTTP_X_TOKEN'].encode(), b' ',
+        environ['wsgi.input'].read(),
+    ]
+
+
+class WsgiToAsgiTest(SimpleTestCase):
+    def request(self, application, path, method='GET', query=b'',
+                headers=(), chunks=(b'',), disconnect=False, **options):
+        messages = [
+            {'type': 'http.request', 'body': chunk, 'more_body': True}
+            for chunk in chunks
+        ]
+        if disconnect:
+            messages.append({'type': 'http.disconnect'})
+        else:
+            messages[-1]['more_body'] = False
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': query, 'headers': list(headers),
+            'server': ('testserver', 80),
+        }
+        adapter = WsgiToAsgi(application, 2, **options)
+        try:
+            asyncio.run(adapter(scope, receive, send))
+        finally:
+            adapter.executor.shutdown()
+        return sent
+
+    def test_translates_request_and_response(self):
+        """Scope и тело доходят до WSGI, ответ уходит двумя сообщениями."""
+        start, body = self.request(
+            echo_application, '/путь/', method='POST', query=b'a=1',
+            headers=[(b'x-token', b'secret')], chunks=(b'he', b'llo'))
+        self.assertEqual(start['status'], 201)
+        self.assertIn((b'content-type', b'text/plain'), start['headers'])
+        self.assertEqual(
+            body['body'].decode('utf-8'), 'POST /путь/?a=1 secret hello')
+
+    def test_large_body_spooled(self):
+        """Тело больше spool_size уходит во временный файл целиком."""
+        chunk = b'x' * 1000
+        start, body = self.request(
+            echo_application, '/', method='POST',
+            headers=[(b'x-token', b't')], chunks=[chunk] * 10,
+            spool_size=1500)
+        self.assertEqual(start['status'], 201)
+        self.assertTrue(body['body'].endswith(chunk * 10))
+
+    def test_body_limit(self):
+        """Тело больше max_body_size получает 413."""
+        start, body = self.request(
+            echo_application, '/', method='POST',
+            chunks=[b'x' * 1000] * 3, max_body_size=2500)
+        self.assertEqual(start['status'], 413)
+        start, body = self.request(
+            echo_application, '/', method='POST',
+            headers=[(b'content-length', b'10000')], max_body_size=2500)
+        self.assertEqual(start['status'], 413)
+
+    def test_disconnect_not_dispatched(self):
+        """Тело, оборванное отключением клиента, до WSGI не доходит."""
+        calls = []
+
+        def application(environ, start_response):
+            calls.append(environ['wsgi.input'].read())
+            start_response('200 OK', [])
+            return [b'']
+
+        sent = self.request(
+            application, '/', method='POST', chunks=(b'half',),
+            disconnect=True)
+        self.assertEqual(calls, [])
+        self.assertEqual(sent, [])
+
+    def test_repeated_cookie_headers(self):
+        """Заголовки Cookie из HTTP/2 склеиваются через '; '."""
+        environ = build_environ({
+            'method': 'GET', 'path': '/',
+            'headers': [(b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                        (b'accept', b'text/html'), (b'accept', b'*/*')],
+        }, None)
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+
+    def test_django_application(self):
+        """Страница проекта отдаётся через ASGI-вход."""
+        start, body = self.request(
+            get_wsgi_application(), '/about/author/',
+            headers=[(b'host', b'testserver')])
+        self.assertEqual(start['status'], 200)
+        self.assertIn(b'<html', body['body'])
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки."""
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        adapter = WsgiToAsgi(echo_application, 1)
+        asyncio.run(adapter({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent,
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
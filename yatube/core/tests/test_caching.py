@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.cache_backends import LOCK_STRIPES, SharedFileCache
+from core.caching import LOCK_SUFFIX, get_or_compute_early, get_or_refresh
+
+
+class SharedFileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+
+    def make_cache(self):
+        return SharedFileCache(self.location, {'KEY_PREFIX': 'test'})
+
+    def test_shared_between_instances(self):
+        """Экземпляры с одним каталогом видят ключи друг друга."""
+        self.make_cache().set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_add_is_atomic(self):
+        """Из параллельных add() удаётся ровно один."""
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.make_cache().add('lock', 1)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+    def test_lock_files_bounded(self):
+        """Файлов блокировок не больше LOCK_STRIPES при любом числе ключей."""
+        cache = self.make_cache()
+        for number in range(200):
+            cache.add(f'key{number}', number)
+            cache.delete(f'key{number}')
+        self.assertLessEqual(len(os.listdir(self.location)), LOCK_STRIPES)
+
+    def test_incr_keeps_timeout(self):
+        """incr() не меняет срок жизни ключа."""
+        cache = self.make_cache()
+        cache.set('counter', 1, None)
+        self.assertEqual(cache.incr('counter'), 2)
+        with mock.patch('time.time', return_value=time.time() + 10 ** 6):
+            self.assertEqual(cache.get('counter'), 2)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+
+@override_settings(CACHE_STALE_TIMEOUT=60, CACHE_LOCK_TIMEOUT=1)
+class GetOrRefreshTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache('get-or-refresh', {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def get(self):
+        return get_or_refresh('key', self.compute, 10, cache=self.cache)
+
+    def test_fresh_value_is_reused(self):
+        """Свежее значение считается один раз."""
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.get(), 1)
+
+    def test_stale_value_refreshed_by_lock_holder(self):
+        """Устаревшее значение пересчитывает только взявший блокировку."""
+        self.get()
+        later = time.time() + 11
+        with mock.patch('core.caching.time.time', return_value=later):
+            self.cache.add('key' + LOCK_SUFFIX, 1)
+            self.assertEqual(self.get(), 1)
+            self.cache.delete('key' + LOCK_SUFFIX)
+            self.assertEqual(self.get(), 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_miss_waits_for_lock_holder(self):
+        """При промахе без блокировки запрос ждёт, а потом считает сам."""
+        self.cache.add('key' + LOCK_SUFFIX, 1)
+        self.assertEqual(self.get(), 1)
+
+    def test_template_tag(self):
+        """{% cache %} из stale_cache кеширует фрагмент."""
+        template = Template(
+            '{% load stale_cache %}{% cache 10 fragment %}{{ value }}'
+            '{% endcache %}')
+        self.assertEqual(template.render(Context({'value': 'a'})), 'a')
+        self.assertEqual(template.render(Context({'value': 'b'})), 'a')
+
+    def test_early_recompute(self):
+        """Долгий пересчёт близко к сроку выполняется досрочно."""
+        def get():
+            return get_or_compute_early(
+                'early', self.compute, 10, cache=self.cache)
+
+        # Значение считалось 10 секунд, до срока осталось 5.
+        self.cache.set('early', ('old', 10, time.time() + 5))
+        with mock.patch('core.caching.random.random', return_value=0.01):
+            self.assertEqual(get(), 'old')
+        with mock.patch('core.caching.random.random', return_value=0.5):
+            self.assertEqual(get(), 1)
+        self.assertEqual(get(), 1)
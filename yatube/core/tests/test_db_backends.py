@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.checks import pool_size_check
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'только для SQLite')
+class SQLitePragmasTest(SimpleTestCase):
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение с файлом базы получает WAL и PRAGMA."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        wrapper = connections['default'].__class__(
+            {**connection.settings_dict,
+             'NAME': os.path.join(directory, 'db.sqlite3')},
+            alias='pragmas')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            pragmas = {}
+            for name in ('journal_mode', 'synchronous', 'mmap_size',
+                         'cache_size', 'busy_timeout', 'temp_store'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            'busy_timeout': 5000,
+            'temp_store': 2,
+        })
+
+
+class PoolSizeCheckTest(SimpleTestCase):
+    @override_settings(ASGI_THREADS=8)
+    def test_pool_smaller_than_threads(self):
+        """Пул меньше ASGI_THREADS даёт предупреждение проверки."""
+        self.assertEqual(pool_size_check(None), [])
+        with mock.patch.dict(
+                settings.DATABASES['default'], {'POOL_MAX_SIZE': 4}):
+            warnings = pool_size_check(None)
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql', 'только для PostgreSQL')
+class PostgreSQLPoolTest(TestCase):
+    def test_closed_connection_returns_to_pool(self):
+        """Закрытое соединение возвращается в пул и берётся снова."""
+        wrapper = connections['default'].__class__(
+            connection.settings_dict, alias='pool')
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        self.assertFalse(raw.closed)
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        wrapper.close()
+
+    def test_exhausted_pool_waits(self):
+        """Занятый пул ждёт возврата соединения, а не падает сразу."""
+        from psycopg2.pool import PoolError
+
+        from core.db.backends.postgresql.base import BlockingConnectionPool
+
+        pool = BlockingConnectionPool(
+            1, 1, timeout=0.1, **connection.get_connection_params())
+        self.addCleanup(pool.closeall)
+        raw = pool.getconn()
+        with self.assertRaises(PoolError):
+            pool.getconn()
+        pool.timeout = 5
+        threading.Timer(0.1, pool.putconn, [raw]).start()
+        self.assertIs(pool.getconn(), raw)
@@ -0,0 +1,95 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.models import KVStore
+
+from core import maintenance
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def create_sessions(expired, alive):
+    now = timezone.now()
+    Session.objects.bulk_create(
+        Session(session_key=f'session{number}', session_data='',
+                expire_date=now + timedelta(
+                    days=-1 if number < expired else 1))
+        for number in range(expired + alive))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MaintenanceTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_clear_sessions(self):
+        """Просроченные сессии удаляются пачками, живые остаются."""
+        create_sessions(expired=5, alive=2)
+        report = maintenance.clear_sessions(batch_size=2, pause=0)
+        self.assertEqual(report.rows, 5)
+        self.assertEqual(report.batches, 3)
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertGreater(report.as_dict()['max_lock_ms'], 0)
+
+    def image_file(self, name, exists=True):
+        if exists:
+            default_storage.save(name, ContentFile(b'image'))
+        image_file = ImageFile(name, default_storage)
+        image_file.set_size((10, 10))
+        default.kvstore._set(image_file.key, image_file)
+        return image_file
+
+    def test_clear_thumbnails(self):
+        """Записи пропавших файлов и ссылки на них удаляются."""
+        source = self.image_file('posts/source.gif')
+        thumbnail = self.image_file('cache/thumbnail.gif')
+        lost = self.image_file('cache/lost.gif', exists=False)
+        deleted = self.image_file('posts/deleted.gif', exists=False)
+        orphan = self.image_file('cache/orphan.gif')
+        ghost = ImageFile('posts/ghost.gif', default_storage)
+        kvstore = default.kvstore
+        kvstore._set(
+            source.key, [thumbnail.key, lost.key], identity='thumbnails')
+        kvstore._set(deleted.key, [orphan.key], identity='thumbnails')
+        kvstore._set(ghost.key, [thumbnail.key], identity='thumbnails')
+        report = maintenance.clear_thumbnails(batch_size=1, pause=0)
+        self.assertEqual(report.rows, 4)
+        self.assertIsNotNone(kvstore.get(source))
+        self.assertIsNotNone(kvstore.get(thumbnail))
+        for image_file in (lost, deleted, orphan):
+            self.assertIsNone(kvstore.get(image_file))
+        self.assertFalse(default_storage.exists(orphan.name))
+        self.assertEqual(
+            kvstore._get(source.key, identity='thumbnails'),
+            [thumbnail.key])
+        self.assertIsNone(kvstore._get(ghost.key, identity='thumbnails'))
+        self.assertEqual(KVStore.objects.count(), 3)
+
+
+class MaintenanceCommandTest(TransactionTestCase):
+    def test_report(self):
+        """Команда выполняет все задачи и печатает их метрики."""
+        create_sessions(expired=3, alive=1)
+        out = io.StringIO()
+        with self.assertLogs('yatube.metrics', 'INFO') as logs:
+            call_command('maintenance', '--pause', '0', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split(':')[0] for line in lines],
+            ['sessions', 'thumbnails', 'vacuum'])
+        self.assertIn('sessions: 3 за', lines[0])
+        self.assertIn('"maintenance"', logs.output[0])
+        self.assertEqual(Session.objects.count(), 1)
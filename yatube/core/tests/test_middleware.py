@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import QueryBudgetExceeded
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:profile', kwargs={'username': self.user})
+
+    def timing(self, response):
+        return dict(
+            part.split(';', 1)
+            for part in response['Server-Timing'].split(', ')
+        )
+
+    @override_settings(PAGE_CACHE_VIEWS={})
+    def test_server_timing_header(self):
+        """Ответ несёт Server-Timing с запросами, шаблонами и кешем."""
+        with self.assertLogs('yatube.metrics', 'INFO') as logs:
+            response = Client().get(self.url)
+        timing = self.timing(response)
+        self.assertEqual(set(timing), {'db', 'tpl', 'cache', 'total'})
+        self.assertRegex(timing['db'], r'dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('misses 1', timing['cache'])
+        self.assertIn('hits 1', self.timing(Client().get(self.url))['cache'])
+        self.assertIn('"view": "posts:profile"', logs.output[0])
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:profile': 1}, QUERY_BUDGET_STRICT=True)
+    def test_budget_strict(self):
+        """Превышение бюджета запросов в строгом режиме — исключение."""
+        with self.assertRaises(QueryBudgetExceeded):
+            Client().get(self.url)
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:profile': 1}, QUERY_BUDGET_STRICT=False)
+    def test_budget_warning(self):
+        """Без строгого режима превышение бюджета только пишется в лог."""
+        with self.assertLogs('yatube.metrics', 'WARNING') as logs:
+            response = Client().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:profile', logs.output[0])
+
+
+class AnonymousPageCacheMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        Post.objects.create(text='Первый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:index')
+
+    def test_anonymous_served_from_cache(self):
+        """Повторный анонимный запрос отдаётся из кеша без запросов к БД."""
+        self.assertEqual(Client().get(self.url)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = Client().get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Первый пост')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_invalidated_by_signals(self):
+        """Новый пост сбрасывает закешированный профиль автора."""
+        # Первая страница главной сама кешируется на INDEX_CACHE_TIMEOUT.
+        url = reverse('posts:profile', kwargs={'username': 'Name'})
+        self.assertEqual(Client().get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(Client().get(url)['X-Page-Cache'], 'hit')
+        Post.objects.create(text='Второй пост', author=self.user)
+        response = Client().get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Второй пост')
+
+    def test_invalidation_scoped(self):
+        """Комментарий сбрасывает страницу своего поста, но не ленту."""
+        post = Post.objects.get(text='Первый пост')
+        other = Post.objects.create(text='Другой пост', author=self.user)
+        urls = [
+            reverse('posts:post_detail', args=[pk])
+            for pk in (post.pk, other.pk)
+        ] + [self.url]
+        for url in urls:
+            Client().get(url)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        for url, state in zip(urls, ('miss', 'hit', 'hit')):
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertEqual(response['X-Page-Cache'], state)
+
+    def test_cookies_bypass_cache(self):
+        """Запросы с сессией или CSRF-кукой идут мимо кеша."""
+        Client().get(self.url)
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        csrf_client = Client()
+        csrf_client.cookies['csrftoken'] = 'token'
+        for client in (authorized_client, csrf_client):
+            with self.subTest(client=client):
+                response = client.get(self.url)
+                self.assertNotIn('X-Page-Cache', response)
+                self.assertIsNotNone(response.context)
+
+    def test_varies_on_language(self):
+        """Для другого языка страница кешируется отдельно."""
+        Client().get(self.url, HTTP_ACCEPT_LANGUAGE='ru')
+        response = Client().get(self.url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_not_cached_views(self):
+        """Представления вне PAGE_CACHE_VIEWS не кешируются."""
+        response = Client().get(reverse('posts:search'))
+        self.assertNotIn('X-Page-Cache', response)
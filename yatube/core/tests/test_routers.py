@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db.routers import (ReplicaRouter, read_only, read_only_block,
+                             request_scope)
+from core.middleware import PrimaryPinMiddleware
+from posts.models import Post
+
+REPLICA_DATABASES = {
+    **settings.DATABASES,
+    'replica1': {**settings.DATABASES['default']},
+    'replica2': {**settings.DATABASES['default']},
+}
+
+
+@override_settings(
+    DATABASES=REPLICA_DATABASES,
+    DATABASE_REPLICAS=['replica1', 'replica2'],
+    REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_in_read_only_block(self):
+        """Чтения внутри read_only идут в реплики, запись — в default."""
+        self.assertIsNone(self.router.db_for_read(Post))
+        with read_only_block():
+            self.assertIn(
+                self.router.db_for_read(Post), ('replica1', 'replica2'))
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё остаётся в default."""
+        with read_only_block():
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_decorator_only_for_safe_methods(self):
+        """Декоратор включает чтение из реплик только для GET и HEAD."""
+        def view(request):
+            return self.router.db_for_read(Post)
+
+        self.assertIsNotNone(read_only(view)(self.factory.get('/')))
+        self.assertIsNone(read_only(view)(self.factory.post('/')))
+
+    def test_reads_after_write_stay_on_primary(self):
+        """После записи запрос читает из default."""
+        with request_scope(unsafe=True), read_only_block():
+            self.assertIsNotNone(self.router.db_for_read(Post))
+            self.router.db_for_write(Post)
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_writes_in_safe_request(self):
+        """Служебные записи GET-запроса не уводят чтения в default."""
+        with request_scope() as state, read_only_block():
+            self.router.db_for_write(Post)
+            self.assertFalse(state.wrote)
+            self.assertIsNotNone(self.router.db_for_read(Post))
+
+    def test_one_replica_per_request(self):
+        """Все чтения запроса идут в одну реплику."""
+        with request_scope(), read_only_block():
+            aliases = {self.router.db_for_read(Post) for _ in range(20)}
+        self.assertEqual(len(aliases), 1)
+
+    def test_session_pinned_after_write(self):
+        """Кука после записи отправляет чтения браузера в default."""
+        def writing_view(request):
+            ReplicaRouter().db_for_write(Post)
+            return HttpResponse()
+
+        @read_only
+        def reading_view(request):
+            return HttpResponse(ReplicaRouter().db_for_read(Post) or '')
+
+        response = PrimaryPinMiddleware(writing_view)(
+            self.factory.post('/'))
+        cookie = response.cookies[PrimaryPinMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 5)
+        request = self.factory.get('/')
+        request.COOKIES[cookie.key] = cookie.value
+        self.assertEqual(
+            PrimaryPinMiddleware(reading_view)(request).content, b'')
+        response = PrimaryPinMiddleware(writing_view)(self.factory.get('/'))
+        self.assertNotIn(PrimaryPinMiddleware.cookie_name, response.cookies)
+        response = PrimaryPinMiddleware(reading_view)(self.factory.get('/'))
+        self.assertNotIn(PrimaryPinMiddleware.cookie_name, response.cookies)
+        self.assertIn(response.content, (b'replica1', b'replica2'))
+
+    def test_no_migrations_on_replicas(self):
+        """Миграции к репликам не применяются."""
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
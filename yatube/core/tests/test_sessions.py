@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import auth_backends
+from core.sessions.backends.cached_db import SessionStore
+
+User = get_user_model()
+
+
+class WriteBehindSessionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def stored(self, session):
+        return Session.objects.get(pk=session.session_key).get_decoded()
+
+    def test_new_session_written_to_db(self):
+        """Сессия, созданная в запросе, попадает в базу целиком."""
+        session = SessionStore()
+        session.create()
+        session['key'] = 'value'
+        session.save()
+        self.assertEqual(self.stored(session), {'key': 'value'})
+
+    def test_changes_deferred(self):
+        """Правки в пределах срока идут только в кеш."""
+        session = SessionStore()
+        session['key'] = 'value'
+        session.save()
+        session = SessionStore(session.session_key)
+        session['key'] = 'new'
+        with self.assertNumQueries(0):
+            session.save()
+        self.assertEqual(SessionStore(session.session_key)['key'], 'new')
+        self.assertEqual(self.stored(session), {'key': 'value'})
+        with self.settings(SESSION_WRITE_BEHIND_SECONDS=0):
+            session.save()
+        self.assertEqual(self.stored(session), {'key': 'new'})
+
+    def test_pending_written_on_read(self):
+        """Несохранённую правку запишет первое чтение после срока."""
+        session = SessionStore()
+        session['key'] = 'value'
+        session.save()
+        session = SessionStore(session.session_key)
+        session['key'] = 'new'
+        session.save()
+        with self.settings(SESSION_WRITE_BEHIND_SECONDS=0):
+            self.assertEqual(SessionStore(session.session_key)['key'], 'new')
+        self.assertEqual(self.stored(session), {'key': 'new'})
+        with self.assertNumQueries(0):
+            SessionStore(session.session_key)['key']
+
+    def test_delete(self):
+        """Удалённая сессия пропадает и из кеша, и из базы."""
+        session = SessionStore()
+        session['key'] = 'value'
+        session.save()
+        session.delete()
+        self.assertFalse(Session.objects.exists())
+        self.assertIsNone(cache.get(session.state_key(session.session_key)))
+        self.assertFalse(SessionStore().exists(session.session_key))
+
+
+@override_settings(
+    SESSION_ENGINE='core.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['core.auth_backends.CachedModelBackend'],
+)
+class CachedUserTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Name', password='old-password-42')
+        self.client = Client()
+        self.client.login(username='Name', password='old-password-42')
+        self.url = reverse('about:author')
+
+    def test_no_queries_for_logged_in_page(self):
+        """Сессия и пользователь на странице берутся из кеша."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change(self):
+        """Смена пароля сбрасывает кеш и не разлогинивает."""
+        self.client.get(self.url)
+        response = self.client.post(
+            reverse('users:password_change_form'), {
+                'old_password': 'old-password-42',
+                'new_password1': 'new-password-42',
+                'new_password2': 'new-password-42',
+            })
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(self.url)
+        self.assertTrue(response.context['user'].check_password(
+            'new-password-42'))
+        self.assertIsNotNone(cache.get(auth_backends.cache_key(self.user.pk)))
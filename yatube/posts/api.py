@@ -0,0 +1,94 @@
+"""
+JSON API лент и поста.
+
+Ленты отдаются курсорными страницами. ETag и Last-Modified берутся
+из версии ленты (posts.feed_versions), поэтому неизменившаяся лента
+отвечает 304, не обращаясь к постам.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from core.db.routers import read_only
+from posts import feed_versions
+from posts.models import Group, Post, User
+from posts.paginators import CursorPaginator
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments': post.comments_count,
+    }
+
+
+def versioned(scope, queryset):
+    """
+    Условный GET по версии ленты. scope и queryset получают
+    аргументы представления и возвращают имя ленты и её посты.
+    """
+    def version(request, **kwargs):
+        if not hasattr(request, 'feed_version'):
+            request.feed_version = feed_versions.get_version(
+                scope(**kwargs), queryset(**kwargs))
+        return request.feed_version
+
+    def decorator(view):
+        return require_safe(read_only(condition(
+            etag_func=lambda request, **kwargs: version(request, **kwargs)[0],
+            last_modified_func=(
+                lambda request, **kwargs: version(request, **kwargs)[1]),
+        )(view)))
+    return decorator
+
+
+def feed_response(request, posts):
+    page = CursorPaginator(
+        posts, settings.NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT,
+    ).cursor_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize_post(post) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, json_dumps_params=JSON_PARAMS)
+
+
+@versioned(lambda: 'all', lambda: Post.objects.all())
+def index(request):
+    return feed_response(
+        request, Post.objects.select_related('author', 'group'))
+
+
+@versioned(
+    lambda slug: f'group:{slug}',
+    lambda slug: Post.objects.filter(group__slug=slug))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request, group.posts.select_related('author', 'group'))
+
+
+@versioned(
+    lambda username: f'author:{username}',
+    lambda username: Post.objects.filter(author__username=username))
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request, author.posts.select_related('author', 'group'))
+
+
+@versioned(
+    lambda post_id: f'post:{post_id}',
+    lambda post_id: Post.objects.filter(pk=post_id))
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    return JsonResponse(serialize_post(post), json_dumps_params=JSON_PARAMS)
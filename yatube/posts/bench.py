@@ -0,0 +1,414 @@
+"""
+Синтетические данные и замеры для нагрузочных прогонов.
+
+seed строит набор, похожий на живой: подписчики и число постов
+у авторов распределены по степенному закону (немногие авторы собирают
+почти всех читателей), группы тоже неравноценны, у части постов есть
+картинки, а комментарии тредами собираются под популярными постами.
+
+measure проходит по представлениям posts.urls тестовым клиентом
+и считает SQL-запросы и перцентили времени ответа. compare сравнивает
+два прогона и возвращает найденные регрессии.
+
+throughput сравнивает число запросов в секунду у WSGI-пула потоков
+и у ASGI-входа (core.asgi) с тем же числом потоков, то есть
+с тем же объёмом памяти и соединений с БД.
+"""
+import asyncio
+import io
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+from itertools import accumulate
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.wsgi import get_wsgi_application
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from core.asgi import WsgiToAsgi, build_environ, call_wsgi
+from posts import thumbnails
+from posts.models import Comment, Follow, Group, Post
+from posts.transfer import batches, preserved_dates
+
+User = get_user_model()
+
+IMAGE_SIZE = (960, 540)
+IMAGE_FILES = 10
+# Адрес замеров вне INTERNAL_IPS: debug toolbar не должен попадать
+# в цифры.
+REMOTE_ADDR = '192.0.2.1'
+
+
+def zipf_weights(count, alpha):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+class Seeder:
+    def __init__(self, prefix='bench', seed=0, alpha=1.1, days=180,
+                 batch_size=1000):
+        self.prefix = prefix
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.alpha = alpha
+        self.days = days
+        self.batch_size = batch_size
+        self.now = timezone.now()
+
+    def bulk_create(self, model, objects):
+        for batch in batches(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def users(self, count):
+        self.bulk_create(User, (
+            User(username=f'{self.prefix}{number}',
+                 first_name=self.fake.first_name(),
+                 last_name=self.fake.last_name(),
+                 password='!')
+            for number in range(count)
+        ))
+        ids = list(
+            User.objects.filter(username__startswith=self.prefix)
+            .order_by('pk').values_list('pk', flat=True))
+        # Место в рейтинге популярности не связано с порядком создания.
+        self.random.shuffle(ids)
+        return ids
+
+    def groups(self, count):
+        self.bulk_create(Group, (
+            Group(slug=f'{self.prefix}-{number}',
+                  title=self.fake.catch_phrase()[:200],
+                  description=self.fake.sentence()[:200])
+            for number in range(count)
+        ))
+        ids = list(
+            Group.objects.filter(slug__startswith=f'{self.prefix}-')
+            .order_by('pk').values_list('pk', flat=True))
+        self.random.shuffle(ids)
+        return ids
+
+    def images(self, count):
+        names = []
+        for number in range(count):
+            name = f'posts/{self.prefix}_{number}.jpg'
+            if not default_storage.exists(name):
+                color = tuple(self.random.randrange(256) for _ in range(3))
+                buffer = io.BytesIO()
+                Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+                name = default_storage.save(name, buffer)
+            names.append(name)
+        return names
+
+    def date(self, after=None, within=None):
+        if after is None:
+            return self.now - timedelta(
+                seconds=self.random.uniform(0, self.days * 86400))
+        seconds = (within or (self.now - after)).total_seconds()
+        return min(after + timedelta(
+            seconds=self.random.uniform(0, seconds)), self.now)
+
+    def posts(self, count, authors, groups, images, image_ratio,
+              group_ratio=0.7):
+        author_weights = zipf_weights(len(authors), self.alpha)
+        group_weights = zipf_weights(len(groups), self.alpha)
+
+        def build():
+            for _ in range(count):
+                pub_date = self.date()
+                group = None
+                if groups and self.random.random() < group_ratio:
+                    group = self.random.choices(
+                        groups, cum_weights=group_weights)[0]
+                image = ''
+                if images and self.random.random() < image_ratio:
+                    image = self.random.choice(images)
+                yield Post(
+                    text=self.fake.paragraph(
+                        nb_sentences=self.random.randint(1, 8)),
+                    author_id=self.random.choices(
+                        authors, cum_weights=author_weights)[0],
+                    group_id=group,
+                    image=image,
+                    pub_date=pub_date,
+                    updated=pub_date,
+                )
+
+        with preserved_dates(Post):
+            self.bulk_create(Post, build())
+
+    def comments(self, count, users):
+        """Треды: пост выбирается по популярности автора, реплики идут
+        в течение трёх дней после публикации."""
+        rank = {user: place for place, user in enumerate(users)}
+        posts = list(
+            Post.objects.filter(author_id__in=users)
+            .values_list('pk', 'author_id', 'pub_date'))
+        if not posts or not users:
+            return
+        posts.sort(key=lambda post: rank[post[1]])
+        weights = zipf_weights(len(posts), self.alpha)
+        thread = timedelta(days=3)
+
+        def build():
+            for _ in range(count):
+                post, _, pub_date = self.random.choices(
+                    posts, cum_weights=weights)[0]
+                yield Comment(
+                    post_id=post,
+                    author_id=self.random.choice(users),
+                    text=self.fake.sentence(),
+                    created=self.date(after=pub_date, within=thread),
+                )
+
+        with preserved_dates(Comment):
+            self.bulk_create(Comment, build())
+
+    def follows(self, users, per_user):
+        """Подписчиков у автора тем больше, чем выше его место."""
+        weights = zipf_weights(len(users), self.alpha)
+
+        def build():
+            for user in users:
+                wanted = self.random.randint(0, 2 * per_user)
+                authors = set(self.random.choices(
+                    users, cum_weights=weights, k=wanted))
+                authors.discard(user)
+                for author in authors:
+                    yield Follow(user_id=user, author_id=author)
+
+        self.bulk_create(Follow, build())
+
+
+def seed(users=100, groups=10, posts=1000, comments=3000, follows=20,
+         image_ratio=0.2, **options):
+    """Заполняет базу и возвращает число созданных объектов по моделям."""
+    seeder = Seeder(**options)
+    before = dataset_size()
+    user_ids = seeder.users(users)
+    group_ids = seeder.groups(groups)
+    images = seeder.images(min(IMAGE_FILES, posts) if image_ratio else 0)
+    seeder.posts(posts, user_ids, group_ids, images, image_ratio)
+    seeder.comments(comments, user_ids)
+    seeder.follows(user_ids, follows)
+    for name in images:
+        thumbnails.enqueue(Post(image=name).image)
+    after = dataset_size()
+    return {name: after[name] - before[name] for name in after}
+
+
+def dataset_size():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def endpoints():
+    """
+    GET-представления posts.urls на самых нагруженных объектах набора:
+    (имя, адрес, пользователь или None). Представления, которые только
+    пишут (комментарий, подписка), не замеряются, чтобы прогоны
+    не меняли данные.
+    """
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    if post is None:
+        return []
+    group = (Group.objects.annotate(size=Count('posts'))
+             .order_by('-size', 'pk').first())
+    star = (User.objects.annotate(size=Count('following'))
+            .order_by('-size', 'pk').first())
+    reader = (User.objects.annotate(size=Count('follower'))
+              .order_by('-size', 'pk').first())
+    word = max(post.text.split(), key=len).strip('.,!?')
+    result = [
+        ('index', reverse('posts:index'), None),
+        ('index_page_2', reverse('posts:index') + '?page=2', None),
+        ('profile', reverse('posts:profile', args=[star.username]), None),
+        ('post_detail', reverse('posts:post_detail', args=[post.pk]), None),
+        ('follow_index', reverse('posts:follow_index'), reader),
+        ('search',
+         reverse('posts:search') + '?' + urlencode({'q': word}), None),
+        ('post_create', reverse('posts:post_create'), post.author),
+        ('post_edit', reverse('posts:post_edit', args=[post.pk]),
+         post.author),
+    ]
+    if group is not None:
+        result.insert(2, (
+            'group_list', reverse('posts:group_list', args=[group.slug]),
+            None))
+    return result
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = math.ceil(share * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, index))]
+
+
+def timed_get(client, url):
+    with ExitStack() as stack:
+        contexts = [
+            stack.enter_context(CaptureQueriesContext(connection))
+            for connection in connections.all()
+        ]
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+    return response, elapsed, sum(len(context) for context in contexts)
+
+
+def measure(iterations=50, warmup=3, cold=False, only=None):
+    results = {}
+    for name, url, user in endpoints():
+        if only and name not in only:
+            continue
+        client = Client(REMOTE_ADDR=REMOTE_ADDR)
+        if user is not None:
+            client.force_login(user)
+        timings, queries = [], []
+        for step in range(warmup + iterations):
+            if cold:
+                cache.clear()
+            response, elapsed, count = timed_get(client, url)
+            if step >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(count)
+        results[name] = {
+            'url': url,
+            'status': response.status_code,
+            'queries': max(queries),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+        }
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connections['default'].vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'iterations': iterations,
+            'cold': cold,
+            'dataset': dataset_size(),
+        },
+        'endpoints': results,
+    }
+
+
+def http_scope(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': (REMOTE_ADDR, 0),
+    }
+
+
+def wsgi_load(application, scope, requests, concurrency):
+    def request(_):
+        return call_wsgi(application, build_environ(scope, io.BytesIO()))[0]
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(request, range(requests)))
+
+
+def asgi_load(application, scope, requests, concurrency):
+    adapter = WsgiToAsgi(application, concurrency)
+
+    async def request():
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        await adapter(scope, receive, send)
+        return sent[0]['status']
+
+    async def load():
+        return await asyncio.gather(*(request() for _ in range(requests)))
+
+    try:
+        return asyncio.run(load())
+    finally:
+        adapter.executor.shutdown()
+
+
+def throughput(url, requests=200, concurrency=8):
+    """Запросов в секунду к url через WSGI и ASGI, потоков поровну."""
+    application = get_wsgi_application()
+    scope = http_scope(url)
+    result = {}
+    for name, load in (('wsgi', wsgi_load), ('asgi', asgi_load)):
+        started = time.perf_counter()
+        statuses = load(application, scope, requests, concurrency)
+        elapsed = time.perf_counter() - started
+        result[name] = {
+            'rps': round(requests / elapsed, 1),
+            'errors': sum(status >= 500 for status in statuses),
+        }
+    return result
+
+
+def measure_throughput(requests=200, concurrency=8, only=None):
+    """throughput для представлений, открытых анонимам."""
+    return {
+        name: throughput(url, requests, concurrency)
+        for name, url, user in endpoints()
+        if user is None and (not only or name in only)
+    }
+
+
+def compare(current, baseline, threshold=0.2, min_ms=1.0):
+    """
+    Регрессии current относительно baseline: любой рост числа
+    запросов, рост p95 больше чем на threshold (и на min_ms, чтобы
+    не ловить шум на быстрых страницах) и падение пропускной
+    способности больше чем на threshold.
+    """
+    regressions = []
+    for name, result in current['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {base["queries"]} -> {result["queries"]}')
+        slower = result['p95_ms'] - base['p95_ms']
+        if slower > min_ms and slower > base['p95_ms'] * threshold:
+            regressions.append(
+                f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс')
+    for name, servers in current.get('throughput', {}).items():
+        for server, result in servers.items():
+            base = baseline.get('throughput', {}).get(name, {}).get(server)
+            if base and result['rps'] < base['rps'] * (1 - threshold):
+                regressions.append(
+                    f'{name} ({server}): {base["rps"]} -> '
+                    f'{result["rps"]} запросов/с')
+    return regressions
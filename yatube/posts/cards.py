@@ -0,0 +1,68 @@
+"""
+Кеш отрендеренных карточек постов.
+
+Ключ карточки содержит id поста и его updated, поэтому правка поста
+сама делает старую карточку недостижимой. Правки группы и автора
+сдвигают updated у их постов (см. posts.signals). Страница ленты
+собирается из кеша одним get_many, рендерятся только промахи.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+from posts.models import Post
+
+CARD_TEMPLATE = 'posts/includes/card_posts.html'
+CARD_VARIANTS = ((False, False), (False, True), (True, False), (True, True))
+# Поля пользователя, которые выводятся в карточке.
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def card_key(post_id, version, show_author, show_group):
+    return 'posts:card:%s:%s:%d%d' % (
+        post_id, version, show_author, show_group)
+
+
+def post_card_key(post, show_author=False, show_group=False):
+    return card_key(
+        post.pk, post.updated.timestamp(), show_author, show_group)
+
+
+def render_cards(posts, show_author=False, show_group=False):
+    """Список HTML-карточек для постов в исходном порядке."""
+    keys = [post_card_key(post, show_author, show_group) for post in posts]
+    cached = cache.get_many(keys)
+    images = [
+        post.image for key, post in zip(keys, posts) if key not in cached]
+    missing = {}
+    cards = []
+    with thumbnails.prefetched(images):
+        for key, post in zip(keys, posts):
+            card = cached.get(key)
+            if card is None:
+                card = render_to_string(CARD_TEMPLATE, {
+                    'post': post,
+                    'show_author': show_author,
+                    'show_group': show_group,
+                })
+                missing[key] = card
+            cards.append(mark_safe(card))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+def forget(post):
+    """Удаляет все варианты карточки поста."""
+    cache.delete_many([
+        post_card_key(post, show_author, show_group)
+        for show_author, show_group in CARD_VARIANTS
+    ])
+
+
+def touch(**lookups):
+    """Сдвигает версию карточек постов, попавших под фильтр."""
+    Post.objects.filter(**lookups).update(updated=timezone.now())
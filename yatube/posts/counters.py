@@ -0,0 +1,90 @@
+"""
+Денормализованные счётчики.
+
+UserCounters хранит число постов, подписчиков, подписок и комментариев
+пользователя, Post.comments_count — число комментариев к посту.
+Счётчики меняются атомарными UPDATE ... SET x = x + 1 из сигналов,
+поэтому страницы профиля и поста не делают COUNT(*).
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from posts.models import Comment, Follow, Post, UserCounters
+
+# Счётчик -> (модель, поле-ссылка на пользователя).
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def _shifted(field, delta):
+    return Greatest(F(field) + delta, Value(0))
+
+
+def actual_user_count(field, outer='user'):
+    """Подзапрос с фактическим значением счётчика пользователя."""
+    model, lookup = USER_COUNTERS[field]
+    totals = (
+        model.objects.filter(**{lookup: OuterRef(outer)})
+        .order_by().values(lookup)
+        .annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(totals), Value(0))
+
+
+def actual_comments_count():
+    totals = (
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post')
+        .annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(totals), Value(0))
+
+
+def recount(user_id):
+    return {
+        field: model.objects.filter(**{f'{lookup}_id': user_id}).count()
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }
+
+
+def get_counters(user):
+    """Счётчики пользователя; недостающая строка создаётся пересчётом."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        counters, _ = UserCounters.objects.get_or_create(
+            user_id=user.pk, defaults=recount(user.pk))
+        return counters
+
+
+def change_user(user_id, field, delta):
+    updated = UserCounters.objects.filter(user_id=user_id).update(
+        **{field: _shifted(field, delta)})
+    if not updated and delta > 0:
+        UserCounters.objects.get_or_create(
+            user_id=user_id, defaults=recount(user_id))
+
+
+def post_changed(post, delta):
+    change_user(post.author_id, 'posts_count', delta)
+
+
+def follow_changed(follow, delta):
+    change_user(follow.author_id, 'followers_count', delta)
+    change_user(follow.user_id, 'following_count', delta)
+
+
+def comment_changed(comment, delta):
+    """
+    По UPDATE на пост и на автора, без чтения строк. Вызывается
+    в транзакции записи комментария; недостающую строку счётчиков
+    автора создаст пересчётом get_counters.
+    """
+    Post.objects.filter(pk=comment.post_id).update(
+        comments_count=_shifted('comments_count', delta))
+    UserCounters.objects.filter(user_id=comment.author_id).update(
+        comments_count=_shifted('comments_count', delta))
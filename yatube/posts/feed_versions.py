@@ -0,0 +1,87 @@
+"""
+Версии лент для условных GET-запросов API.
+
+Версия ленты — ETag и Last-Modified, посчитанные одним агрегатом
+по её постам и сохранённые в кеше. Сигналы сбрасывают версии лент,
+которых коснулась правка поста: у ленты меняется токен, а версия
+хранится под ключом с токеном, при котором её начали считать.
+Поэтому сброс во время подсчёта не перезаписывается устаревшей
+версией. Правки авторов и групп сдвигают общее поколение ключей.
+Пока версия в кеше, ответ 304 не требует ни одного запроса к БД;
+живёт она не дольше FEED_VERSION_TIMEOUT, так что сброс в другом
+процессе с locmem-кешем догоняет её по сроку.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+GENERATION_KEY = 'posts:feed-version:generation'
+
+
+def generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def token_key(scope, gen=None):
+    """Ключ (токен, время сброса) ленты."""
+    return 'posts:feed-version:%s:%s' % (gen or generation(), scope)
+
+
+def post_scopes(post):
+    """Ленты, в которые попадает пост."""
+    scopes = ['all', f'author:{post.author.username}', f'post:{post.pk}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def get_version(scope, queryset):
+    """(etag, last_modified) ленты, при промахе считается по БД."""
+    timeout = settings.FEED_VERSION_TIMEOUT
+    key = token_key(scope)
+    marker = cache.get(key)
+    if marker is None:
+        marker = (uuid.uuid4().hex, None)
+        # Сброс, успевший записать свой токен, не затирается.
+        if not cache.add(key, marker, timeout):
+            marker = cache.get(key, marker)
+    token, changed = marker
+    version_key = f'{key}:{token}'
+    version = cache.get(version_key)
+    if version is None:
+        stats = queryset.order_by().aggregate(
+            updated=Max('updated'),
+            count=Count('id'),
+            comments=Sum('comments_count'),
+        )
+        etag = hashlib.md5(
+            '{updated}:{count}:{comments}'.format(**stats).encode()
+        ).hexdigest()
+        # Удаление поста не оставляет следа в агрегате,
+        # поэтому время сброса версии тоже учитывается.
+        changed = max(filter(None, (stats['updated'], changed)), default=None)
+        version = (etag, changed)
+        cache.set(version_key, version, timeout)
+    return version
+
+
+def forget(post):
+    """Сбрасывает версии лент поста, запоминая время изменения."""
+    gen = generation()
+    now = timezone.now()
+    cache.set_many({
+        token_key(scope, gen): (uuid.uuid4().hex, now)
+        for scope in post_scopes(post)
+    }, settings.FEED_VERSION_TIMEOUT)
+
+
+def forget_all():
+    """Сдвигает поколение: все версии лент считаются заново."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
@@ -0,0 +1,39 @@
+"""
+Общий queryset лент постов: главной, группы, профиля и подписок.
+
+Автор и группа карточки приходят тем же запросом (select_related),
+а из строк берутся только столбцы, которые выводит карточка и нужны
+её ключу в кеше: пароль и почта автора, описание группы в ленту
+не попадают. Порядок совпадает с ключом курсорной пагинации.
+"""
+from posts.cards import CARD_USER_FIELDS
+from posts.models import Post
+
+ORDERING = ('-pub_date', '-id')
+CARD_FIELDS = (
+    'text', 'pub_date', 'updated', 'image', 'author', 'group',
+    'group__slug', 'group__title',
+) + tuple(sorted(f'author__{name}' for name in CARD_USER_FIELDS))
+
+
+def card_fields(prefix=''):
+    return [prefix + name for name in CARD_FIELDS]
+
+
+def posts(queryset=None):
+    """Посты для карточек ленты."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return (
+        queryset.select_related('author', 'group')
+        .only(*card_fields())
+        .order_by(*ORDERING)
+    )
+
+
+def timeline_entries(queryset):
+    """Строки ленты подписок вместе с постами для карточек."""
+    return (
+        queryset.select_related('post__author', 'post__group')
+        .only('pub_date', 'post', *card_fields('post__'))
+    )
@@ -0,0 +1,52 @@
+"""
+Кеш первой страницы главной ленты.
+
+Строки страницы пересчитываются досрочно (core.caching.XFetch),
+поэтому по истечении срока запросы не бросаются в БД разом.
+post_create и post_edit сразу пересчитывают страницу, а версия
+страницы входит в ключ HTML-фрагмента index_page.
+"""
+import time
+
+from django.conf import settings
+
+from core.caching import compute_and_store, get_or_compute_early
+from posts import feeds
+from posts.paginators import CursorPaginator, paginate
+
+
+def feed():
+    return feeds.posts()
+
+
+def first_page_key(per_page):
+    return f'posts:index:first-page:{per_page}'
+
+
+def build_first_page(per_page):
+    page = CursorPaginator(feed(), per_page).cursor_page()
+    return list(page), page.has_next(), time.time()
+
+
+def get_page(request):
+    """Страница главной ленты; первая берётся из кеша."""
+    if 'page' in request.GET or 'cursor' in request.GET:
+        return paginate(request, feed())
+    per_page = settings.NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT
+    rows, has_next, version = get_or_compute_early(
+        first_page_key(per_page),
+        lambda: build_first_page(per_page),
+        settings.INDEX_CACHE_TIMEOUT)
+    page = CursorPaginator(feed(), per_page)._cursor_page(
+        rows, None, has_next, False)
+    page.version = version
+    return page
+
+
+def write_through():
+    """Пересчитывает закешированную первую страницу после правки."""
+    per_page = settings.NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT
+    compute_and_store(
+        first_page_key(per_page),
+        lambda: build_first_page(per_page),
+        settings.INDEX_CACHE_TIMEOUT)
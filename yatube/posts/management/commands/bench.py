@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет представления posts.urls тестовым клиентом: число '
+        'SQL-запросов и перцентили времени ответа. Результат пишется '
+        'в JSON и может сравниваться с прошлым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько первых запросов не учитывать.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Замерить только это представление (можно повторять).'
+        )
+        parser.add_argument(
+            '--servers', action='store_true',
+            help='Сравнить запросы в секунду у WSGI и ASGI.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Потоков у обоих серверов при --servers.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на представление при --servers.'
+        )
+        parser.add_argument('-o', '--output', help='Куда записать JSON.')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='JSON прошлого прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95, доля (0.2 — 20%%).'
+        )
+
+    def handle(self, *args, iterations, warmup, cold, endpoints=None,
+               servers=False, concurrency=8, requests=200, output=None,
+               compare=None, threshold=0.2, **options):
+        if iterations < 1:
+            raise CommandError('--iterations должно быть больше нуля.')
+        report = bench.measure(
+            iterations=iterations, warmup=warmup, cold=cold,
+            only=endpoints)
+        if not report['endpoints']:
+            raise CommandError('Нет данных, сначала запустите seed_bench.')
+        for name, result in report['endpoints'].items():
+            self.stdout.write(
+                '{name:<14} {status} запросов {queries:>3}  '
+                'p50 {p50_ms:>8} p95 {p95_ms:>8} p99 {p99_ms:>8} мс'
+                .format(name=name, **result))
+        if servers:
+            report['throughput'] = bench.measure_throughput(
+                requests, concurrency, endpoints)
+            for name, result in report['throughput'].items():
+                self.stdout.write(
+                    '{name:<14} WSGI {wsgi[rps]:>8} ASGI {asgi[rps]:>8} '
+                    'запросов/с'.format(name=name, **result))
+        if output:
+            with open(output, 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+        if compare:
+            with open(compare, encoding='utf-8') as stream:
+                baseline = json.load(stream)
+            regressions = bench.compare(report, baseline, threshold)
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write('Регрессий нет.')
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (EXPORT_FIELDS, FORMATS, export_records,
+                            write_records)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', choices=list(EXPORT_FIELDS), default='posts',
+            help='Что выгружать.'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл выгрузки, по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько строк читать из БД за раз.'
+        )
+
+    def handle(self, *args, model, format, output=None, batch_size=2000,
+               **options):
+        records = export_records(model, batch_size)
+        if output is None:
+            count = write_records(sys.stdout, records, format, model)
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as stream:
+                count = write_records(stream, records, format, model)
+        self.stderr.write(f'Выгружено строк: {count}')
@@ -0,0 +1,89 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from posts.models import Comment, Post
+from posts.transfer import (BUILDERS, FORMATS, KEEP_IDS, batches,
+                            group_map, preserved_dates, read_records, repair,
+                            taken_ids, user_map)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из NDJSON или CSV '
+        'пачками через bulk_create и восстанавливает производные данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument(
+            '--model', choices=list(BUILDERS), default='posts',
+            help='Что загружать.'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла, по умолчанию по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько строк вставлять за раз.'
+        )
+        parser.add_argument(
+            '--no-repair',
+            action='store_true',
+            help='Не пересчитывать счётчики, ленты и поиск '
+                 '(при загрузке нескольких файлов подряд).'
+        )
+
+    def handle(self, *args, path, model, format=None, batch_size=2000,
+               no_repair=False, **options):
+        file_format = format or os.path.splitext(path)[1].lstrip('.')
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Не удалось определить формат {path}, укажите --format.')
+        if model in KEEP_IDS:
+            self.check_ids(path, file_format, KEEP_IDS[model], batch_size)
+        build = BUILDERS[model]
+        users, groups = user_map(), group_map()
+        loaded = skipped = 0
+        with open(path, encoding='utf-8', newline='') as stream, \
+                preserved_dates(Post, Comment):
+            records = read_records(stream, file_format)
+            for batch in batches(records, batch_size):
+                objects = build(batch, users, groups)
+                if objects:
+                    with transaction.atomic():
+                        type(objects[0]).objects.bulk_create(objects)
+                loaded += len(objects)
+                skipped += len(batch) - len(objects)
+                self.stdout.write(
+                    f'Загружено строк: {loaded}, пропущено: {skipped}')
+        if model in ('posts', 'comments'):
+            self.reset_sequences(Post, Comment)
+        if not no_repair:
+            repair(self.stdout)
+            self.stdout.write('Счётчики, ленты подписок и поиск обновлены.')
+
+    def check_ids(self, path, file_format, model, batch_size):
+        """
+        Строки с занятыми id затёрли бы чужие: комментарии выгрузки
+        легли бы к постам этой базы. Такую загрузку не начинаем.
+        """
+        with open(path, encoding='utf-8', newline='') as stream:
+            taken = taken_ids(
+                model, read_records(stream, file_format), batch_size)
+        if taken:
+            shown = ', '.join(map(str, taken[:10]))
+            more = f' и ещё {len(taken) - 10}' if len(taken) > 10 else ''
+            raise CommandError(
+                f'В {model._meta.db_table} уже заняты id {shown}{more}. '
+                'Ничего не загружено.')
+
+    def reset_sequences(self, *models):
+        """После вставки с явными id сдвигает последовательности."""
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,118 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import ThumbnailJob
+from posts.thumbnails import generate
+
+MAX_ATTEMPTS = 3
+# Задание, которое выполняется дольше, брошено упавшим обработчиком.
+STALE_AFTER = 10 * 60
+
+
+def claim(job_id):
+    """Забирает задание себе, если его не взял другой обработчик."""
+    return ThumbnailJob.objects.filter(
+        pk=job_id, status=ThumbnailJob.PENDING,
+    ).update(status=ThumbnailJob.RUNNING, attempts=F('attempts') + 1,
+             updated=timezone.now())
+
+
+def reclaim_stale(stale_after=STALE_AFTER):
+    """
+    Возвращает в очередь задания, взятые больше stale_after секунд
+    назад; исчерпавшие попытки помечаются ошибкой.
+    """
+    stale = ThumbnailJob.objects.filter(
+        status=ThumbnailJob.RUNNING,
+        updated__lt=timezone.now() - timedelta(seconds=stale_after))
+    now = timezone.now()
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ThumbnailJob.FAILED, error='Обработчик не завершил задание',
+        updated=now)
+    return failed + stale.update(status=ThumbnailJob.PENDING, updated=now)
+
+
+def run(job_id):
+    if not claim(job_id):
+        return None
+    job = ThumbnailJob.objects.get(pk=job_id)
+    try:
+        generate(job)
+    except Exception as error:
+        job.error = repr(error)
+        job.status = (
+            ThumbnailJob.FAILED if job.attempts >= MAX_ATTEMPTS
+            else ThumbnailJob.PENDING)
+    else:
+        job.error = ''
+        job.status = ThumbnailJob.DONE
+    job.save(update_fields=['status', 'error', 'updated'])
+    return job.status
+
+
+def run_in_thread(job_id):
+    # У каждого потока пула своё соединение с БД.
+    close_old_connections()
+    try:
+        return run(job_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок из очереди ThumbnailJob.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и выйти.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Число потоков обработки.'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=50,
+            help='Сколько заданий выбирать за раз.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help='Пауза при пустой очереди, секунды.'
+        )
+        parser.add_argument(
+            '--stale-after', type=float, default=STALE_AFTER,
+            help='Через сколько секунд вернуть в очередь задание, '
+                 'брошенное упавшим обработчиком.'
+        )
+
+    def handle(self, *args, once=False, workers=2, batch=50, sleep=2.0,
+               stale_after=STALE_AFTER, **options):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                reclaim_stale(stale_after)
+                job_ids = list(
+                    ThumbnailJob.objects
+                    .filter(status=ThumbnailJob.PENDING)
+                    .order_by('created')
+                    .values_list('pk', flat=True)[:batch])
+                if job_ids:
+                    # Один обработчик работает в основном потоке.
+                    if workers == 1:
+                        statuses = map(run, job_ids)
+                    else:
+                        statuses = pool.map(run_in_thread, job_ids)
+                    statuses = [status for status in statuses if status]
+                    self.stdout.write(
+                        f'Готово {statuses.count(ThumbnailJob.DONE)}, '
+                        f'ошибок {statuses.count(ThumbnailJob.FAILED)}')
+                    continue
+                if once:
+                    return
+                time.sleep(sleep)
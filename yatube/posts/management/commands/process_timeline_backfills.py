@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import TimelineBackfill
+
+
+class Command(BaseCommand):
+    help = 'Раскладывает посты остывших авторов по лентам подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и выйти.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=5.0,
+            help='Пауза при пустой очереди, секунды.'
+        )
+
+    def handle(self, *args, once=False, sleep=5.0, **options):
+        while True:
+            pending = (
+                TimelineBackfill.objects.select_related('author')
+                .order_by('created').first())
+            if pending is not None:
+                timeline.process_backfill(pending)
+                self.stdout.write(f'Разложены посты {pending.author}')
+                continue
+            if once:
+                return
+            time.sleep(sleep)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts.counters import (USER_COUNTERS, actual_comments_count,
+                            actual_user_count)
+from posts.models import Post, User, UserCounters
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики пользователей и постов '
+        'и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя.'
+        )
+
+    def handle(self, *args, dry_run=False, **options):
+        missing = User.objects.filter(counters__isnull=True)
+        self.report('нет строки счётчиков', missing.count())
+        if not dry_run:
+            UserCounters.objects.bulk_create(
+                (UserCounters(user_id=pk)
+                 for pk in missing.values_list('pk', flat=True).iterator()),
+                batch_size=BATCH_SIZE,
+            )
+        for field in USER_COUNTERS:
+            self.repair(
+                UserCounters.objects.all(), field,
+                actual_user_count(field), dry_run)
+        self.repair(
+            Post.objects.order_by(), 'comments_count',
+            actual_comments_count(), dry_run)
+
+    def repair(self, queryset, field, actual, dry_run):
+        """Одним UPDATE выравнивает счётчик там, где он разошёлся."""
+        model = queryset.model
+        drifted = queryset.annotate(actual=actual).exclude(
+            **{field: F('actual')})
+        pks = list(drifted.values_list('pk', flat=True))
+        if not dry_run:
+            for start in range(0, len(pks), BATCH_SIZE):
+                batch = pks[start:start + BATCH_SIZE]
+                with transaction.atomic():
+                    model.objects.filter(pk__in=batch).update(
+                        **{field: actual})
+        self.report(f'{model.__name__}.{field}', len(pks))
+
+    def report(self, name, drifted):
+        self.stdout.write(f'{name}: расхождений {drifted}')
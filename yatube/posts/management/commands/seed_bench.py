@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from posts import bench
+from posts.transfer import repair
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных прогонов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя.'
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=180,
+            help='За сколько дней разбросаны посты.'
+        )
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей, slug групп и картинок.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, users, groups, posts, comments, follows,
+               image_ratio, alpha, days, prefix, seed, batch_size,
+               **options):
+        created = bench.seed(
+            users=users, groups=groups, posts=posts, comments=comments,
+            follows=follows, image_ratio=image_ratio, alpha=alpha,
+            days=days, prefix=prefix, seed=seed, batch_size=batch_size)
+        for name, count in created.items():
+            self.stdout.write(f'{name}: +{count}')
+        repair(self.stdout)
+        self.stdout.write('Счётчики, ленты подписок и поиск обновлены.')
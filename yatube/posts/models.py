@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.db.models import UniqueConstraint, CheckConstraint, Q, F
 from core.models import CreateModel
 
@@ -37,13 +37,33 @@ class Post(CreateModel):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
         default_related_name = 'posts'
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
+    def save(self, *args, **kwargs):
+        # Счётчик постов, раздача по лентам и поиск (post_save)
+        # фиксируются вместе со строкой поста.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return self.text[:15]
 
@@ -65,6 +85,16 @@ class Comment(models.Model):
 
     class Meta:
         default_related_name = 'comment'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Сигнал post_save меняет счётчики в той же транзакции.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text[:15]
@@ -89,3 +119,128 @@ class Follow(models.Model):
             UniqueConstraint(
                 fields=['user', 'author'], name='unique_follow'),
         ]
+
+    def save(self, *args, **kwargs):
+        # Счётчики подписок и ленты меняет post_save в этой транзакции.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """
+    Материализованная лента подписок.
+    Строка появляется у каждого подписчика при публикации поста,
+    pub_date скопирована из поста, чтобы лента читалась
+    диапазоном по индексу (user, pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'),
+        ]
+
+
+class TimelineBackfill(models.Model):
+    """
+    Автор, переставший быть горячим, чьи посты ещё не разложены
+    по лентам подписчиков. Пока строка есть, автор считается горячим
+    и его посты подмешиваются при чтении; раскладывает их команда
+    process_timeline_backfills.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timeline_backfill'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Дозаполнение лент'
+        verbose_name_plural = 'Дозаполнения лент'
+
+
+class UserCounters(models.Model):
+    """
+    Денормализованные счётчики пользователя.
+    Обновляются сигналами при сохранении и удалении Post, Follow
+    и Comment, расхождения чинит команда recount_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class ThumbnailJob(models.Model):
+    """
+    Задание на построение миниатюры картинки.
+    Ставится при загрузке картинки, выполняется командой
+    process_thumbnails вне цикла запроса.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    source = models.CharField('Исходный файл', max_length=255)
+    geometry = models.CharField('Размер', max_length=50)
+    options = models.TextField('Параметры', default='{}')
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['source', 'geometry', 'options'],
+                name='unique_thumbnail_job'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'created'],
+                name='thumbnail_job_queue_idx'),
+        ]
+        verbose_name = 'Задание на миниатюру'
+        verbose_name_plural = 'Задания на миниатюры'
+
+    def __str__(self):
+        return f'{self.source} {self.geometry}'
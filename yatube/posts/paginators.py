@@ -0,0 +1,257 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и ключ строки в непрозрачный токен."""
+    payload = json.dumps([direction, values], default=str)
+    token = base64.urlsafe_b64encode(payload.encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, при ошибке поднимает InvalidCursor."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def estimated_rows(queryset):
+    """
+    Число строк таблицы queryset по статистике СУБД без COUNT(*):
+    reltuples в PostgreSQL, sqlite_stat1 (после ANALYZE) в SQLite.
+    None, если статистики нет.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0].split('.')[0])
+    return estimate if estimate >= 0 else None
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор: вместо OFFSET фильтрует по ключу сортировки
+    последней показанной строки, поэтому глубокие страницы стоят
+    столько же, сколько первая, а COUNT(*) не выполняется вовсе.
+    Обычные номера страниц (get_page) остаются доступны.
+
+    Курсорная страница — обычный Page без номера: has_next/has_previous
+    заменены готовыми ответами, соседние страницы доступны
+    через next_cursor/previous_cursor.
+
+    У нумерованной страницы есть elided_range — окно номеров вокруг
+    текущей с многоточиями вместо пропусков. Лента по всей таблице
+    больше PAGINATOR_ESTIMATE_THRESHOLD строк считается по статистике
+    СУБД, отфильтрованные ленты — COUNT(*) по своему индексу.
+    """
+    ELLIPSIS = '…'
+    estimated = False
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), **kwargs):
+        self.ordering = tuple(ordering)
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_rows(self.object_list)
+            if (estimate is not None
+                    and estimate >= settings.PAGINATOR_ESTIMATE_THRESHOLD):
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        page = super().page(number)
+        page.elided_range = list(self.get_elided_page_range(page.number))
+        return page
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг number и по краям, пропуски — ELLIPSIS."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def _fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def cursor_for(self, obj, direction):
+        values = [getattr(obj, name) for name in self._fields()]
+        return encode_cursor(direction, values)
+
+    def _parse_values(self, values):
+        model = self.object_list.model
+        fields = self._fields()
+        if len(values) != len(fields):
+            raise InvalidCursor(values)
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(fields, values)
+            ]
+        except ValidationError:
+            raise InvalidCursor(values)
+
+    def _seek(self, values, direction):
+        """
+        Условие «строго после ключа» с учётом направления сортировки.
+        Нестрогая граница по первому полю отдельно от дизъюнкции нужна
+        планировщику, чтобы читать индекс диапазоном.
+        """
+        condition = Q()
+        bound = None
+        for position, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != (direction == PREVIOUS)
+            lookup = 'lt' if descending else 'gt'
+            if bound is None:
+                bound = Q(**{f'{field}__{lookup}e': values[position]})
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for prev_name, value in zip(self._fields(), values[:position]):
+                step &= Q(**{prev_name: value})
+            condition |= step
+        return bound & condition
+
+    def _cursor_page(self, rows, cursor, has_next, has_previous):
+        page = self._get_page(rows, None, self)
+        page.is_cursor = True
+        page.cursor = cursor
+        page.has_next = lambda: has_next
+        page.has_previous = lambda: has_previous
+        page.next_cursor = (
+            self.cursor_for(rows[-1], NEXT) if has_next and rows else None)
+        page.previous_cursor = (
+            self.cursor_for(rows[0], PREVIOUS)
+            if has_previous and rows else None)
+        return page
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.ordering
+        ]
+
+    def _fetch(self, values, direction, limit):
+        """Первые limit строк после ключа values в направлении direction."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, direction))
+        if direction == PREVIOUS:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        return list(queryset[:limit])
+
+    def cursor_page(self, cursor=None):
+        """Возвращает страницу по токену; битый токен — первая страница."""
+        direction, values = NEXT, None
+        if cursor:
+            try:
+                direction, raw_values = decode_cursor(cursor)
+                values = self._parse_values(raw_values)
+            except InvalidCursor:
+                cursor, direction, values = None, NEXT, None
+        rows = self._fetch(values, direction, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            return self._cursor_page(rows, cursor, True, has_more)
+        return self._cursor_page(rows, cursor, has_more, values is not None)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Курсорная лента из нескольких источников со своими индексами.
+    Источник — (queryset, ordering, convert): каждый читается отдельным
+    диапазоном по ключу, не больше limit строк, а строки сливаются
+    по ключу в Python без повторов по pk. Один запрос с OR по разным
+    индексам сортировал бы все подходящие строки целиком.
+    Поля сортировки должны идти в одном направлении. Нумерованные
+    страницы считаются по object_list, как у CursorPaginator.
+    """
+
+    def __init__(self, object_list, per_page, sources, **kwargs):
+        self.sources = sources
+        super().__init__(object_list, per_page, **kwargs)
+
+    def _fetch(self, values, direction, limit):
+        rows = {}
+        for queryset, ordering, convert in self.sources:
+            source = CursorPaginator(queryset, limit, ordering=ordering)
+            for row in source._fetch(values, direction, limit):
+                row = convert(row) if convert else row
+                rows[row.pk] = row
+        fields = self._fields()
+        descending = (
+            self.ordering[0].startswith('-') != (direction == PREVIOUS))
+        return sorted(
+            rows.values(),
+            key=lambda row: [getattr(row, name) for name in fields],
+            reverse=descending,
+        )[:limit]
+
+
+def paginate(request, queryset, per_page=None,
+             paginator_class=CursorPaginator, **kwargs):
+    """
+    Общая пагинация лент.
+    ?cursor= и запрос без параметров обслуживает курсорная пагинация,
+    ?page= поддерживается для совместимости со старыми ссылками.
+    """
+    paginator = paginator_class(
+        queryset,
+        per_page or settings.NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT,
+        **kwargs
+    )
+    if 'page' in request.GET:
+        return paginator.get_page(request.GET.get('page'))
+    return paginator.cursor_page(request.GET.get('cursor'))
@@ -0,0 +1,196 @@
+"""
+Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND, по умолчанию по СУБД:
+для SQLite — индекс FTS5 с ранжированием bm25, для остальных —
+простой поиск по вхождению. Индекс обновляется сигналами Post.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from posts.models import Post
+from posts.paginators import (PREVIOUS, CursorPaginator, InvalidCursor,
+                              encode_cursor)
+
+FTS_TABLE = 'posts_post_fts'
+BACKENDS = {
+    'sqlite': 'posts.search.SQLiteFTSBackend',
+}
+SNIPPET_WORDS = 24
+# Границы совпадений в сниппете до экранирования HTML.
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def marked(text):
+    """Экранирует текст и превращает границы совпадений в <mark>."""
+    return mark_safe(
+        escape(text)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>'))
+
+
+class RankedPaginator(CursorPaginator):
+    """
+    Курсорная пагинация выдачи поиска. Ключ строки — ранг и id поста,
+    строки по ключу выбирает функция fetch бэкенда.
+    """
+
+    def __init__(self, fetch, per_page):
+        Paginator.__init__(self, [], per_page)
+        self.fetch = fetch
+
+    def cursor_for(self, obj, direction):
+        return encode_cursor(direction, [obj.search_rank, obj.pk])
+
+    def _parse_values(self, values):
+        try:
+            rank, pk = values
+            return [float(rank), int(pk)]
+        except (TypeError, ValueError):
+            raise InvalidCursor(values)
+
+    def _fetch(self, values, direction, limit):
+        return self.fetch(values, direction, limit)
+
+
+class BaseSearchBackend:
+    def index(self, post):
+        """Добавляет или обновляет пост в индексе."""
+
+    def remove(self, post_id):
+        """Убирает пост из индекса."""
+
+    def rebuild(self):
+        """Строит индекс заново по всем постам."""
+
+    def search(self, query, cursor=None, per_page=None):
+        """
+        Курсорная страница постов, подходящих под запрос. У постов есть
+        search_rank (меньше — лучше) и search_snippet с разметкой <mark>.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Таблица FTS5 с копией текста поста, rowid равен id поста."""
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}')
+
+    def match_expression(self, query):
+        # Каждое слово в кавычках и с префиксным поиском: так запрос
+        # не разбирается как синтаксис FTS5, а «кот» находит «котики».
+        return ' '.join('"%s"*' % term for term in terms(query))
+
+    def search(self, query, cursor=None, per_page=None):
+        match = self.match_expression(query)
+
+        def fetch(values, direction, limit):
+            if not match:
+                return []
+            return self.fetch(match, values, direction, limit)
+
+        paginator = RankedPaginator(
+            fetch, per_page or settings.NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT)
+        return paginator.cursor_page(cursor)
+
+    def fetch(self, match, values, direction, limit):
+        # bm25 отрицателен, лучшие совпадения идут первыми,
+        # при равном ранге — более новые посты.
+        after, order = '>', 'bm25({t}), rowid DESC'
+        if direction == PREVIOUS:
+            after, order = '<', 'bm25({t}) DESC, rowid'
+        sql = (
+            'SELECT rowid, bm25({t}), snippet({t}, 0, %s, %s, %s, %s) '
+            'FROM {t} WHERE {t} MATCH %s'
+        )
+        params = [MARK_START, MARK_END, '…', SNIPPET_WORDS, match]
+        if values is not None:
+            before = '<' if after == '>' else '>'
+            sql += (
+                f' AND (bm25({{t}}) {after} %s'
+                f' OR (bm25({{t}}) = %s AND rowid {before} %s))')
+            params += [values[0], values[0], values[1]]
+        sql += f' ORDER BY {order} LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql.format(t=FTS_TABLE), params)
+            hits = cursor.fetchall()
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for post_id, rank, snippet in hits])
+        rows = []
+        for post_id, rank, snippet in hits:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.search_rank = rank
+            post.search_snippet = marked(snippet)
+            rows.append(post)
+        return rows
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Поиск по вхождению всех слов без отдельного индекса.
+    Ранга нет, выдача идёт от новых постов к старым.
+    """
+
+    def search(self, query, cursor=None, per_page=None):
+        words = terms(query)
+        posts = Post.objects.select_related('author', 'group')
+        if not words:
+            posts = posts.none()
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        page = CursorPaginator(
+            posts, per_page or settings.NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT,
+        ).cursor_page(cursor)
+        pattern = re.compile(
+            '|'.join(re.escape(word) for word in words), re.IGNORECASE)
+        for post in page:
+            text = Truncator(post.text).words(SNIPPET_WORDS)
+            post.search_rank = 0
+            post.search_snippet = marked(pattern.sub(
+                lambda found: MARK_START + found.group() + MARK_END, text))
+        return page
+
+
+@lru_cache(maxsize=None)
+def load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    """Бэкенд по текущему SEARCH_BACKEND, по экземпляру на путь."""
+    return load_backend(
+        getattr(settings, 'SEARCH_BACKEND', None) or BACKENDS.get(
+            connection.vendor, 'posts.search.SimpleSearchBackend'))
@@ -0,0 +1,119 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core import page_cache
+
+from posts import (cards, counters, feed_versions, search, thumbnails,
+                   timeline)
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def post_pages_changed(post):
+    """Сбрасывает ленты, профиль автора и страницу поста."""
+    page_cache.bump(page_cache.FEED, page_cache.author(post.author.username),
+                    page_cache.post(post.pk))
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # save() без update_fields пишет все поля, например при смене
+    # пароля: карточки сбрасываются, только если поле карточки
+    # действительно изменилось.
+    instance._card_changed = False
+    if raw or instance._state.adding:
+        return
+    fields = cards.CARD_USER_FIELDS
+    if update_fields is not None:
+        fields = fields.intersection(update_fields)
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._card_changed = stored is None or any(
+        stored[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+    elif instance._card_changed:
+        cards.touch(author=instance)
+        feed_versions.forget_all()
+        page_cache.bump()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        cards.touch(group=instance)
+        feed_versions.forget_all()
+    page_cache.bump()
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Посты останутся без группы, а у карточек пропадёт ссылка на неё.
+    cards.touch(group=instance)
+    feed_versions.forget_all()
+    page_cache.bump()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Post.save держит транзакцию вокруг вставки и этого обработчика.
+    if created:
+        counters.post_changed(instance, 1)
+        timeline.fan_out(instance)
+        # И постам из админки или shell: иначе задания поставит
+        # первое чтение ленты, лишней вставкой в запросе.
+        thumbnails.enqueue(instance.image)
+    search.get_backend().index(instance)
+    feed_versions.forget(instance)
+    post_pages_changed(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_changed(instance, -1)
+    cards.forget(instance)
+    search.get_backend().remove(instance.pk)
+    feed_versions.forget(instance)
+    post_pages_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_changed(instance, 1)
+        feed_versions.forget(instance.post)
+        page_cache.bump(page_cache.post(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_changed(instance, -1)
+    feed_versions.forget(instance.post)
+    page_cache.bump(page_cache.post(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_changed(instance, 1)
+        timeline.follow_added(instance)
+        page_cache.bump(page_cache.author(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    # Удаление и так идёт в транзакции (Collector.delete).
+    counters.follow_changed(instance, -1)
+    timeline.follow_removed(instance)
+    page_cache.bump(page_cache.author(instance.author.username))
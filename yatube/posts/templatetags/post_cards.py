@@ -0,0 +1,11 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, show_author=False, show_group=False):
+    """Отрендеренные карточки постов ленты, собранные из кеша."""
+    return render_cards(list(posts), show_author, show_group)
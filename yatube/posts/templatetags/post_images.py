@@ -0,0 +1,29 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(image, css_class='card-img my-2'):
+    """
+    Картинка поста: WebP-варианты разной ширины в srcset
+    и JPEG-миниатюра для браузеров без WebP.
+    Пока миниатюры строятся, выводится исходная картинка.
+    """
+    fallback = thumbnails.get_thumbnail(
+        image, thumbnails.CARD_GEOMETRY, thumbnails.CARD_OPTIONS)
+    srcset = []
+    for width, geometry, options in thumbnails.VARIANTS:
+        variant = thumbnails.get_thumbnail(image, geometry, options)
+        if variant is None:
+            srcset = None
+            break
+        srcset.append(f'{variant.url} {width}w')
+    return {
+        'src': (fallback or image).url,
+        'srcset': ', '.join(srcset) if srcset else '',
+        'type': 'image/' + thumbnails.VARIANT_FORMAT.lower(),
+        'css_class': css_class,
+    }
@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_versions
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Name')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            text='Текст', author=self.user, group=self.group)
+        self.client = Client()
+        self.urls = {
+            'index': reverse('api:index'),
+            'group': reverse('api:group_list', kwargs={'slug': 'group'}),
+            'profile': reverse('api:profile', kwargs={'username': 'Name'}),
+            'detail': reverse(
+                'api:post_detail', kwargs={'post_id': self.post.pk}),
+        }
+
+    def test_feeds_serialize_posts(self):
+        """Ленты и пост отдаются компактным JSON."""
+        expected = {
+            'id': self.post.pk,
+            'text': 'Текст',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'Name',
+            'group': 'group',
+            'image': None,
+            'comments': 0,
+        }
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                data = self.client.get(url).json()
+                if name != 'detail':
+                    self.assertIsNone(data['next'])
+                    data = data['results'][0]
+                self.assertEqual(data, expected)
+        missing = reverse('api:group_list', kwargs={'slug': 'missing'})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    @override_settings(NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT=1)
+    def test_cursor_paging(self):
+        """Ленты листаются курсором из ответа."""
+        newer = Post.objects.create(text='Новый', author=self.user)
+        first = self.client.get(self.urls['index']).json()
+        self.assertEqual(first['results'][0]['id'], newer.pk)
+        second = self.client.get(
+            self.urls['index'], {'cursor': first['next']}).json()
+        self.assertEqual(second['results'][0]['id'], self.post.pk)
+        self.assertIsNone(second['next'])
+
+    def test_not_modified_without_queries(self):
+        """Неизменившаяся лента отвечает 304 без запросов к БД."""
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                etag = response['ETag']
+                self.assertFalse(etag.startswith('W/'))
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_refresh_etag(self):
+        """Новый пост, правка, комментарий и удаление меняют ETag."""
+        def etag(url):
+            return self.client.get(url)['ETag']
+
+        changes = (
+            lambda: Post.objects.create(
+                text='Ещё', author=self.user, group=self.group),
+            lambda: Post.objects.filter(pk=self.post.pk).get().save(),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'),
+            lambda: Post.objects.filter(text='Ещё').get().delete(),
+        )
+        for change in changes:
+            before = {name: etag(url) for name, url in self.urls.items()}
+            change()
+            for name in ('index', 'group', 'profile'):
+                with self.subTest(feed=name):
+                    self.assertNotEqual(etag(self.urls[name]), before[name])
+
+    def test_author_rename_refreshes_etag(self):
+        """Правка автора сдвигает версии всех лент."""
+        before = self.client.get(self.urls['index'])['ETag']
+        self.user.username = 'Renamed'
+        self.user.save()
+        self.assertNotEqual(
+            self.client.get(self.urls['index'])['ETag'], before)
+
+    def test_forget_during_aggregate_not_overwritten(self):
+        """Сброс во время подсчёта версии не затирается её результатом."""
+        post = self.post
+        posts = Post.objects.all()
+
+        class Racing:
+            def order_by(self):
+                return self
+
+            def aggregate(self, **aggregates):
+                stats = posts.aggregate(**aggregates)
+                # Правка поста между агрегатом и записью версии.
+                Post.objects.filter(pk=post.pk).update(text='Новый')
+                feed_versions.forget(post)
+                return stats
+
+        stale = feed_versions.get_version('all', Racing())
+        self.assertNotEqual(feed_versions.get_version('all', posts), stale)
+
+    @override_settings(FEED_VERSION_TIMEOUT=0)
+    def test_version_expires(self):
+        """Версия живёт не дольше FEED_VERSION_TIMEOUT."""
+        url = self.urls['index']
+        before = self.client.get(url)['ETag']
+        # Пост мимо сигналов: сброс в другом процессе сюда не дошёл.
+        Post.objects.bulk_create([Post(text='Ещё', author=self.user)])
+        self.assertNotEqual(self.client.get(url)['ETag'], before)
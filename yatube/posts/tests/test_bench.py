@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+
+from posts.bench import compare, percentile
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BenchCommandsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        call_command(
+            'seed_bench', users=30, groups=3, posts=120, comments=200,
+            follows=5, image_ratio=0.5, stdout=io.StringIO())
+
+    def test_seed_bench(self):
+        """Набор создан, счётчики и ленты досчитаны, популярность неравна."""
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comment.count())
+        followers = sorted(
+            User.objects.annotate(size=Count('following'))
+            .values_list('size', flat=True), reverse=True)
+        self.assertGreater(followers[0], 3 * followers[len(followers) // 2])
+
+    def test_bench_report_and_compare(self):
+        """Прогон пишет JSON по представлениям и ловит регрессии."""
+        path = os.path.join(self.directory, 'bench.json')
+        call_command('bench', iterations=2, warmup=0, cold=True,
+                     output=path, stdout=io.StringIO())
+        with open(path, encoding='utf-8') as stream:
+            report = json.load(stream)
+        self.assertIn('follow_index', report['endpoints'])
+        for result in report['endpoints'].values():
+            self.assertEqual(result['status'], 200)
+        self.assertEqual(compare(report, report), [])
+        report['endpoints']['index']['queries'] -= 1
+        with open(path, 'w', encoding='utf-8') as stream:
+            json.dump(report, stream)
+        with self.assertRaises(CommandError):
+            call_command('bench', iterations=1, endpoints=['index'],
+                         cold=True, compare=path, stdout=io.StringIO())
+
+    def test_percentile(self):
+        """Перцентиль по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_compare_throughput(self):
+        """Падение запросов в секунду сверх порога — регрессия."""
+        def report(rps):
+            return {'endpoints': {}, 'throughput': {
+                'index': {'wsgi': {'rps': rps, 'errors': 0}}}}
+
+        self.assertEqual(compare(report(90), report(100)), [])
+        self.assertEqual(len(compare(report(70), report(100))), 1)
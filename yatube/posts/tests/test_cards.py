@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cards import post_card_key, render_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Name', first_name='Иван')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            text='Исходный текст', author=self.user, group=self.group)
+        self.group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug})
+
+    def test_cards_served_from_cache(self):
+        """Повторная сборка ленты берёт карточки из кеша."""
+        posts = list(Post.objects.select_related('author', 'group'))
+        render_cards(posts, show_author=True)
+        key = post_card_key(self.post, show_author=True)
+        cache.set(key, 'из кеша')
+        self.assertEqual(render_cards(posts, show_author=True), ['из кеша'])
+
+    def test_post_edit_invalidates_card(self):
+        """Правка поста меняет версию карточки."""
+        client = Client()
+        client.get(self.group_url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertContains(client.get(self.group_url), 'Новый текст')
+
+    def test_author_and_group_changes_invalidate_cards(self):
+        """Правки автора и группы сбрасывают карточки их постов."""
+        client = Client()
+        client.get(self.group_url)
+        self.user.first_name = 'Пётр'
+        self.user.save()
+        self.assertContains(client.get(self.group_url), 'Пётр')
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': self.user})
+        client.get(profile_url)
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertContains(client.get(profile_url), '/group/renamed/')
+        self.group.delete()
+        self.assertNotContains(client.get(profile_url), 'все записи группы')
+
+    def test_unrelated_user_save_keeps_cards(self):
+        """Сохранение автора без правки полей карточки их не трогает."""
+        updated = self.post.updated
+        self.user.set_password('new-password')
+        self.user.save()
+        self.user.save(update_fields=['last_login'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated, updated)
+        self.user.first_name = 'Пётр'
+        self.user.save()
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
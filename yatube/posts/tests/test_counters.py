@@ -0,0 +1,91 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ком')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        author, reader = self.counters(self.author), self.counters(self.reader)
+        self.assertEqual(author.posts_count, 1)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(reader.following_count, 1)
+        self.assertEqual(reader.comments_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        follow.delete()
+        post.delete()
+        author, reader = self.counters(self.author), self.counters(self.reader)
+        self.assertEqual(author.posts_count, 0)
+        self.assertEqual(author.followers_count, 0)
+        self.assertEqual(reader.following_count, 0)
+        self.assertEqual(reader.comments_count, 0)
+
+    def test_comment_write_queries(self):
+        """Комментарий меняет счётчики двумя UPDATE без чтений."""
+        post = Post.objects.select_related('author', 'group').get(
+            pk=Post.objects.create(text='Текст', author=self.author).pk)
+        with self.assertNumQueries(3):
+            comment = Comment.objects.create(
+                post=post, author=self.reader, text='Ком')
+        with self.assertNumQueries(3):
+            comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.counters(self.reader).comments_count, 0)
+
+    def test_profile_shows_counters(self):
+        """Профиль выводит счётчики из UserCounters."""
+        Post.objects.create(text='Текст', author=self.author)
+        UserCounters.objects.filter(user=self.author).update(
+            posts_count=42, followers_count=7)
+        response = Client().get(
+            reverse('posts:profile', kwargs={'username': self.author}))
+        self.assertContains(response, 'Всего постов: 42')
+        self.assertContains(response, 'Подписчиков: 7')
+
+    def test_recount_repairs_drift(self):
+        """recount_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ком')
+        UserCounters.objects.filter(user=self.author).update(posts_count=5)
+        UserCounters.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        out = StringIO()
+        call_command('recount_counters', '--dry-run', stdout=out)
+        self.assertEqual(self.counters(self.author).posts_count, 5)
+        call_command('recount_counters', stdout=out)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.reader).comments_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+
+class CountersTransactionTest(TransactionTestCase):
+    def test_post_and_counters_commit_together(self):
+        """Сбой в post_save откатывает и вставку поста."""
+        author = User.objects.create_user(username='Author')
+        with mock.patch('posts.timeline.fan_out', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Post.objects.create(text='Текст', author=author)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            UserCounters.objects.get(user=author).posts_count, 0)
@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class IndexCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Name')
+        self.post = Post.objects.create(text='Первый пост', author=self.user)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:index')
+
+    def test_first_page_served_from_cache(self):
+        """Повторный запрос первой страницы не читает посты."""
+        self.client.get(self.url)
+        with mock.patch('posts.index_cache.build_first_page') as build:
+            response = self.client.get(self.url)
+        build.assert_not_called()
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_post_create_and_edit_write_through(self):
+        """Создание и правка поста сразу видны на главной."""
+        self.client.get(self.url)
+        self.client.post(
+            reverse('posts:post_create'), data={'text': 'Новый пост'})
+        self.assertContains(self.client.get(self.url), 'Новый пост')
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный пост'})
+        self.assertContains(self.client.get(self.url), 'Исправленный пост')
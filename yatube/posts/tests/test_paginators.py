@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+from posts.paginators import CursorPaginator
+
+User = get_user_model()
+POSTS_COUNT = 25
+PER_PAGE = 10
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.user)
+            for i in range(POSTS_COUNT)
+        )
+        # Половина постов с одинаковой датой: проверяем разрешение по id.
+        same_date = timezone.now()
+        Post.objects.filter(
+            id__in=Post.objects.values('id')[:POSTS_COUNT // 2]
+        ).update(pub_date=same_date)
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+
+    def test_walk_forward(self):
+        """Проход по курсорам отдаёт все посты ровно один раз по порядку."""
+        seen = []
+        page = self.paginator.cursor_page()
+        while True:
+            seen.extend(post.id for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.cursor_page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        first = self.paginator.cursor_page()
+        second = self.paginator.cursor_page(first.next_cursor)
+        self.assertTrue(second.has_previous())
+        back = self.paginator.cursor_page(second.previous_cursor)
+        self.assertEqual(
+            [post.id for post in back], [post.id for post in first])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_cursor_page_without_count(self):
+        """Курсорная страница строится одним запросом без COUNT(*)."""
+        with self.assertNumQueries(1):
+            page = self.paginator.cursor_page()
+            len(page)
+            page.has_other_pages()
+
+    def test_invalid_cursor(self):
+        """Битый курсор открывает первую страницу."""
+        for cursor in ('мусор', 'W10', 'WyJuIiwgWzFdXQ'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.cursor_page(cursor)
+                self.assertEqual(
+                    [post.id for post in page], self.expected[:PER_PAGE])
+
+    def test_views_pagination_modes(self):
+        """Ленты отдают курсорную страницу, а ?page= — номерную."""
+        client = Client()
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        response = client.get(url)
+        self.assertTrue(response.context['page_obj'].is_cursor)
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+        response = client.get(url, {'page': 3})
+        page_obj = response.context['page_obj']
+        self.assertFalse(hasattr(page_obj, 'is_cursor'))
+        self.assertEqual(page_obj.number, 3)
+        self.assertEqual(len(page_obj), POSTS_COUNT - 2 * PER_PAGE)
+
+
+class ElidedPageRangeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Name')
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.user) for i in range(100))
+
+    def test_elided_range(self):
+        """Окно номеров вокруг текущей страницы и края."""
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        ellipsis = CursorPaginator.ELLIPSIS
+        self.assertEqual(
+            paginator.page(50).elided_range,
+            [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100])
+        self.assertEqual(
+            paginator.page(2).elided_range,
+            [1, 2, 3, 4, ellipsis, 100])
+        self.assertEqual(
+            CursorPaginator(Post.objects.all(), 20).page(1).elided_range,
+            [1, 2, 3, 4, 5])
+
+    def test_template_renders_window(self):
+        """Шаблон выводит окно, а не ссылку на каждую страницу."""
+        with override_settings(NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT=1):
+            response = Client().get(
+                reverse('posts:profile', args=['Name']), {'page': 50})
+        self.assertContains(response, '?page=52')
+        self.assertNotContains(response, '?page=53"')
+        self.assertContains(response, '?page=100"', count=2)
+        self.assertContains(response, CursorPaginator.ELLIPSIS, count=2)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=50)
+    def test_estimated_count(self):
+        """Большая таблица считается по статистике СУБД без COUNT(*)."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(1) as context:
+            self.assertEqual(paginator.count, 100)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+        self.assertTrue(paginator.estimated)
+        filtered = CursorPaginator(Post.objects.filter(author=self.user), 10)
+        self.assertEqual(filtered.count, 100)
+        self.assertFalse(filtered.estimated)
+
+    def test_small_table_counts_exactly(self):
+        """Без статистики или ниже порога число строк точное."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 100)
+        self.assertFalse(paginator.estimated)
@@ -0,0 +1,164 @@
+import io
+import shutil
+import tempfile
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.test import (Client, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import feeds, thumbnails
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.transfer import repair
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+PAGE_SIZES = (1, 10, 100)
+AUTHORS = 10
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryCountTest(TestCase):
+    """
+    Число SQL-запросов лент не зависит от размера страницы
+    и укладывается в QUERY_BUDGETS. На каждой странице разные авторы,
+    группы и картинки, так что N+1 в карточке сразу виден.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        User.objects.bulk_create(
+            User(username=f'author{number}', first_name='Автор',
+                 last_name=str(number))
+            for number in range(AUTHORS))
+        authors = list(User.objects.filter(username__startswith='author'))
+        Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'group{number}',
+                  description='Описание')
+            for number in range(AUTHORS))
+        groups = list(Group.objects.order_by('slug'))
+        # Половина постов у author0 в group0, чтобы профиль и группа
+        # набрали по 100 постов, остальные — у разных авторов и групп.
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}',
+                 author=authors[number % AUTHORS if number % 2 else 0],
+                 group=groups[number % AUTHORS if number % 2 else 0],
+                 image=default_storage.save(
+                     f'posts/{number}.gif', ContentFile(SMALL_GIF)))
+            for number in range(200))
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=authors[number % AUTHORS],
+                    text=f'Коммент {number}')
+            for number in range(100))
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors)
+        for post in Post.objects.all():
+            thumbnails.enqueue(post.image)
+        repair(io.StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def count_queries(self, client, url):
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return sum(len(context) for context in contexts)
+
+    def assert_constant_queries(self, view_name, url, client, setting):
+        budget = settings.QUERY_BUDGETS[view_name]
+        counts = {}
+        for per_page in PAGE_SIZES:
+            with override_settings(**{setting: per_page}):
+                cache.clear()
+                cold = self.count_queries(client, url)
+                warm = self.count_queries(client, url)
+            counts[per_page] = (cold, warm)
+            self.assertLessEqual(cold, budget, f'{url}, {per_page}')
+        self.assertEqual(
+            len(set(counts.values())), 1, f'{view_name}: {counts}')
+
+    def assert_feed(self, view_name, url, clients):
+        for client in clients:
+            with self.subTest(view=view_name, client=client):
+                self.assert_constant_queries(
+                    view_name, url, client,
+                    'NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT')
+
+    def test_index(self):
+        """Главная."""
+        self.assert_feed(
+            'posts:index', reverse('posts:index'),
+            (Client(), self.authorized_client))
+
+    def test_group_posts(self):
+        """Страница группы."""
+        self.assert_feed(
+            'posts:group_list',
+            reverse('posts:group_list', args=['group0']),
+            (Client(), self.authorized_client))
+
+    def test_profile(self):
+        """Профиль автора."""
+        self.assert_feed(
+            'posts:profile', reverse('posts:profile', args=['author0']),
+            (Client(), self.authorized_client))
+
+    def test_follow_index(self):
+        """Лента подписок."""
+        self.assert_feed(
+            'posts:follow_index', reverse('posts:follow_index'),
+            (self.authorized_client,))
+
+    def test_post_detail(self):
+        """Страница поста: размер страницы комментариев."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        for client in (Client(), self.authorized_client):
+            with self.subTest(client=client):
+                self.assert_constant_queries(
+                    'posts:post_detail', url, client, 'COMMENTS_PER_PAGE')
+
+
+class FeedQuerysetTest(SimpleTestCase):
+    def test_card_projection(self):
+        """Ленты не читают лишние столбцы автора и группы."""
+        querysets = (
+            feeds.posts(),
+            feeds.timeline_entries(TimelineEntry.objects.all()),
+        )
+        for queryset in querysets:
+            sql = str(queryset.query)
+            with self.subTest(sql=sql):
+                self.assertIn('"posts_group"."slug"', sql)
+                self.assertIn('"auth_user"."first_name"', sql)
+                self.assertNotIn('"auth_user"."password"', sql)
+                self.assertNotIn('"auth_user"."email"', sql)
+                self.assertNotIn('"posts_group"."description"', sql)
+                self.assertNotIn('comments_count', sql)
@@ -0,0 +1,110 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+# Полный проход по таблице или сортировка во временном B-дереве.
+SQLITE_BAD_PLAN = re.compile(r'SCAN \w+(?! USING)( |$)|TEMP B-TREE')
+POSTGRES_BAD_PLAN = re.compile(r'Seq Scan|\bSort\b')
+# Запросы страниц лент: выборка из таблиц лент с сортировкой.
+FEED_QUERY = re.compile(
+    r'FROM "(posts_post|posts_timelineentry|posts_comment)".*ORDER BY',
+    re.DOTALL)
+
+
+@override_settings(
+    NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT=1, COMMENTS_PER_PAGE=1,
+    PAGE_CACHE_VIEWS={})
+class FeedQueryPlanTest(TestCase):
+    """
+    EXPLAIN запросов, которые выполняют сами представления лент:
+    первая страница и страница по курсору должны читаться по индексу
+    без отдельной сортировки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Name')
+        cls.hot_author = User.objects.create_user(username='Hot')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for author in (cls.user, cls.hot_author):
+            Post.objects.bulk_create(
+                Post(text=f'Текст {number}', author=author, group=cls.group)
+                for number in range(3))
+        cls.post = Post.objects.filter(author=cls.user).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Коммент {number}')
+            for number in range(3))
+        Follow.objects.create(user=cls.user, author=cls.hot_author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+                rows = [row[0] for row in cursor.fetchall()]
+                return '\n'.join(rows), POSTGRES_BAD_PLAN
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            rows = [row[-1] for row in cursor.fetchall()]
+            return '\n'.join(rows), SQLITE_BAD_PLAN
+
+    def feed_queries(self, url, page_name):
+        """SQL лент первой страницы и страницы по курсору."""
+        queries = []
+        cursor = ''
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            queries += [
+                query['sql'] for query in context.captured_queries
+                if FEED_QUERY.search(query['sql'])
+            ]
+            cursor = response.context[page_name].next_cursor
+            self.assertIsNotNone(cursor, url)
+        return queries
+
+    def assert_indexed(self, url, page_name='page_obj'):
+        queries = self.feed_queries(url, page_name)
+        self.assertTrue(queries, url)
+        for sql in queries:
+            plan, bad_plan = self.explain(sql)
+            with self.subTest(url=url, sql=sql):
+                self.assertIsNone(bad_plan.search(plan), plan)
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент не сканируют таблицы и не сортируют в памяти."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.assert_indexed(url)
+        self.assert_indexed(
+            reverse('posts:post_detail', args=[self.post.pk]), 'comments')
+
+    @override_settings(
+        TIMELINE_FANOUT_LIMIT=0,
+        QUERY_BUDGETS={**settings.QUERY_BUDGETS, 'posts:follow_index': 7})
+    def test_hot_author_follow_feed(self):
+        """Лента подписок с горячим автором тоже читается по индексам."""
+        Follow.objects.create(
+            user=self.user,
+            author=User.objects.create_user(username='Other'))
+        self.assert_indexed(reverse('posts:follow_index'))
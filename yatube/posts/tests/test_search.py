@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import SimpleSearchBackend, get_backend
+
+User = get_user_model()
+
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Name')
+        self.client = Client()
+        self.url = reverse('posts:search')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_ranking_and_highlight(self):
+        """Лучшие совпадения идут первыми, слова подсвечены."""
+        weak = Post.objects.create(
+            text='Про котиков и собак', author=self.user)
+        strong = Post.objects.create(
+            text='Котики, котики и ещё раз котики', author=self.user)
+        Post.objects.create(text='Только собаки', author=self.user)
+        page = self.search('котик')
+        self.assertEqual(list(page), [strong, weak])
+        self.assertIn('<mark>Котики</mark>', page[0].search_snippet)
+
+    def test_results_use_post_card(self):
+        """Выдача рисуется общей карточкой поста со сниппетом."""
+        post = Post.objects.create(text='Про котиков', author=self.user)
+        response = self.client.get(self.url, {'q': 'котиков'})
+        self.assertTemplateUsed(response, 'posts/includes/card_posts.html')
+        self.assertContains(response, '<mark>котиков</mark>')
+        self.assertContains(
+            response, reverse('posts:post_detail', args=[post.pk]))
+
+    def test_backend_follows_setting(self):
+        """Бэкенд выбирается по текущему SEARCH_BACKEND."""
+        default = get_backend()
+        with override_settings(
+                SEARCH_BACKEND='posts.search.SimpleSearchBackend'):
+            self.assertIsInstance(get_backend(), SimpleSearchBackend)
+        self.assertIs(get_backend(), default)
+
+    def test_snippet_escapes_html(self):
+        """Текст поста в сниппете экранируется."""
+        Post.objects.create(
+            text='<script>alert(1)</script> котики', author=self.user)
+        response = self.client.get(self.url, {'q': 'котики'})
+        self.assertNotContains(response, '<script>alert')
+        self.assertContains(response, '&lt;script&gt;')
+
+    def test_index_follows_edit_and_delete(self):
+        """Правка и удаление поста меняют индекс."""
+        post = Post.objects.create(text='Старый текст', author=self.user)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(list(self.search('старый')), [])
+        self.assertEqual(list(self.search('новый')), [post])
+        post.delete()
+        self.assertEqual(list(self.search('новый')), [])
+
+    def test_query_syntax_is_not_parsed(self):
+        """Служебные символы FTS в запросе не ломают поиск."""
+        Post.objects.create(text='Текст AND ещё', author=self.user)
+        for query in ('"AND(', 'NEAR(*', '-', '***'):
+            with self.subTest(query=query):
+                self.search(query)
+
+    @override_settings(NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT=2)
+    def test_cursor_pagination(self):
+        """Курсоры проходят всю выдачу без повторов в обе стороны."""
+        posts = [
+            Post.objects.create(text=f'котики {number}', author=self.user)
+            for number in range(5)
+        ]
+        seen = []
+        page = self.search('котики')
+        pages = [list(page)]
+        while page.has_next():
+            page = self.search('котики', cursor=page.next_cursor)
+            pages.append(list(page))
+        for rows in pages:
+            seen.extend(rows)
+        self.assertEqual(sorted(seen, key=lambda post: post.pk), posts)
+        self.assertEqual([len(rows) for rows in pages], [2, 2, 1])
+        page = self.search('котики', cursor=page.previous_cursor)
+        self.assertEqual(list(page), pages[1])
@@ -0,0 +1,139 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.management.commands.process_thumbnails import (MAX_ATTEMPTS,
+                                                          STALE_AFTER)
+from posts.models import Post, ThumbnailJob
+from posts.thumbnails import (CARD_GEOMETRY, CARD_OPTIONS, PRESETS,
+                              VARIANT_FORMAT, VARIANT_WIDTHS, get_thumbnail,
+                              prefetched)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Name')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Текст',
+            'image': SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF,
+                content_type='image/gif'),
+        })
+        return Post.objects.get()
+
+    def test_post_create_enqueues_thumbnail(self):
+        """Новая картинка ставит задание, а лента отдаёт оригинал."""
+        post = self.create_post()
+        jobs = ThumbnailJob.objects.filter(
+            source=post.image.name, status=ThumbnailJob.PENDING)
+        self.assertEqual(jobs.count(), len(PRESETS))
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(response, post.image.url)
+        self.assertNotContains(response, 'srcset')
+        self.assertEqual(ThumbnailJob.objects.count(), len(PRESETS))
+
+    def test_worker_builds_thumbnail(self):
+        """Обработчик строит миниатюру, и страницы переходят на неё."""
+        post = self.create_post()
+        profile_url = reverse('posts:profile', kwargs={'username': 'Name'})
+        self.assertContains(self.client.get(profile_url), post.image.url)
+        call_command(
+            'process_thumbnails', once=True, workers=1, stdout=io.StringIO())
+        self.assertFalse(
+            ThumbnailJob.objects.exclude(status=ThumbnailJob.DONE).exists())
+        response = self.client.get(profile_url)
+        self.assertNotContains(response, post.image.url)
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    def test_variants_in_srcset(self):
+        """Готовые варианты разной ширины попадают в srcset карточки."""
+        self.create_post()
+        call_command(
+            'process_thumbnails', once=True, workers=1, stdout=io.StringIO())
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, f'type="image/{VARIANT_FORMAT.lower()}"')
+        for width in VARIANT_WIDTHS:
+            self.assertContains(response, f' {width}w')
+
+    def test_prefetched_reads_kvstore_once(self):
+        """Внутри prefetched миниатюры берутся без запросов к БД."""
+        post = self.create_post()
+        call_command(
+            'process_thumbnails', once=True, workers=1, stdout=io.StringIO())
+        ThumbnailJob.objects.all().delete()
+        cache.clear()
+        with self.assertNumQueries(1):
+            with prefetched([post.image, post.image]):
+                with self.assertNumQueries(0):
+                    ready = get_thumbnail(
+                        post.image, CARD_GEOMETRY, CARD_OPTIONS)
+        self.assertIsNotNone(ready)
+        # Готовые миниатюры в очередь заново не ставятся.
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_post_detail_enqueues_in_one_insert(self):
+        """Страница поста ставит недостающие миниатюры одной вставкой."""
+        post = self.create_post()
+        ThumbnailJob.objects.all().delete()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        for expected in (1, 0):
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            inserts = [
+                query for query in context.captured_queries
+                if query['sql'].startswith('INSERT')
+                and 'posts_thumbnailjob' in query['sql']
+            ]
+            self.assertEqual(len(inserts), expected)
+        self.assertTrue(ThumbnailJob.objects.exists())
+
+    def test_stale_running_reclaimed(self):
+        """Задание упавшего обработчика возвращается в очередь."""
+        post = self.create_post()
+        stale = timezone.now() - timedelta(seconds=STALE_AFTER + 1)
+        jobs = ThumbnailJob.objects.filter(source=post.image.name)
+        jobs.update(status=ThumbnailJob.RUNNING, attempts=1, updated=stale)
+        exhausted = jobs.first()
+        jobs.filter(pk=exhausted.pk).update(attempts=MAX_ATTEMPTS)
+        call_command(
+            'process_thumbnails', once=True, workers=1, stdout=io.StringIO())
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, ThumbnailJob.FAILED)
+        self.assertEqual(
+            jobs.filter(status=ThumbnailJob.DONE).count(), len(PRESETS) - 1)
@@ -0,0 +1,124 @@
+import io
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineBackfill, TimelineEntry
+from posts.timeline import HOT_AUTHORS_CACHE_KEY
+
+User = get_user_model()
+# Каждый горячий автор в подписках — отдельный запрос ленты.
+TWO_HOT_BUDGETS = {**settings.QUERY_BUDGETS, 'posts:follow_index': 7}
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Author')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow_feed_ids(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page_obj']]
+
+    def test_post_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков при записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post, pub_date=post.pub_date).exists())
+        self.assertEqual(self.follow_feed_ids(), [post.id])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дозаполняет ленту, отписка чистит её."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertEqual(
+            self.follow_feed_ids(), [post.id for post in reversed(posts)])
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        self.assertEqual(self.follow_feed_ids(), [])
+
+    @override_settings(
+        TIMELINE_FANOUT_LIMIT=0, QUERY_BUDGETS=TWO_HOT_BUDGETS)
+    def test_hot_author_read_on_demand(self):
+        """Посты горячего автора не раскладываются, но видны в ленте."""
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other)
+        hot_post = Post.objects.create(text='Горячий', author=self.author)
+        other_post = Post.objects.create(text='Обычный', author=other)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            self.follow_feed_ids(), [other_post.id, hot_post.id])
+
+    @override_settings(NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT=4)
+    def test_hot_author_cursor_walk(self):
+        """Слитая лента с горячим автором листается без повторов."""
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other)
+        for number in range(5):
+            Post.objects.create(text=f'Разложен {number}', author=self.author)
+        with override_settings(
+                TIMELINE_FANOUT_LIMIT=0, QUERY_BUDGETS=TWO_HOT_BUDGETS):
+            cache.clear()
+            for number in range(5):
+                Post.objects.create(text=f'Горячий {number}',
+                                    author=self.author)
+                Post.objects.create(text=f'Обычный {number}', author=other)
+            expected = list(Post.objects.order_by(
+                '-pub_date', '-id').values_list('id', flat=True))
+            seen, cursor = [], ''
+            while True:
+                response = self.client.get(
+                    reverse('posts:follow_index'), {'cursor': cursor})
+                page = response.context['page_obj']
+                seen += [post.id for post in page]
+                if not page.has_next():
+                    break
+                cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_cooled_author_backfilled(self):
+        """Остывший автор раскладывается оставшимся подписчикам фоном."""
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text='Горячий', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_feed_ids(), [post.id])
+        late_post = Post.objects.create(text='Пока ждём', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command(
+            'process_timeline_backfills', '--once', stdout=io.StringIO())
+        self.assertFalse(TimelineBackfill.objects.exists())
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')),
+            {(self.reader.pk, post.pk), (self.reader.pk, late_post.pk)})
+        self.assertEqual(self.follow_feed_ids(), [late_post.id, post.id])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0, TIMELINE_HOT_AUTHORS_TIMEOUT=0)
+    def test_hot_authors_not_cached_per_process(self):
+        """Без общего кеша горячие авторы не берутся из кеша процесса."""
+        # Множество, закешированное до того, как автор стал горячим.
+        cache.set(HOT_AUTHORS_CACHE_KEY, set(), None)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Горячий', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_feed_ids(), [post.id])
@@ -0,0 +1,109 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import get_backend
+
+User = get_user_model()
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.pub_date = timezone.now() - timedelta(days=30)
+        self.post = Post.objects.create(
+            text='Старый пост про котиков', author=self.author,
+            group=self.group)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.pub_date)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def run_command(self, *args, **options):
+        call_command(*args, stdout=io.StringIO(), stderr=io.StringIO(),
+                     **options)
+
+    def export(self, model, file_format):
+        path = os.path.join(self.directory, f'{model}.{file_format}')
+        self.run_command(
+            'export_posts', model=model, format=file_format, output=path)
+        return path
+
+    def round_trip(self, file_format):
+        paths = [
+            self.export(model, file_format)
+            for model in ('posts', 'comments', 'follows')
+        ]
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.filter(username='reader').delete()
+        for model, path in zip(('posts', 'comments', 'follows'), paths):
+            self.run_command(
+                'import_posts', path, model=model, batch_size=1,
+                no_repair=model != 'follows')
+
+    def assert_restored(self):
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.group, self.group)
+        reader = User.objects.get(username='reader')
+        self.assertEqual(post.comment.get().author, reader)
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=self.author).exists())
+        self.assertEqual(post.comments_count, 1)
+        author = User.objects.get(username='author')
+        self.assertEqual(author.counters.posts_count, 1)
+        self.assertEqual(reader.counters.following_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists())
+        self.assertEqual(list(get_backend().search('котиков')), [post])
+
+    def test_ndjson_round_trip(self):
+        """Выгрузка и загрузка NDJSON сохраняют данные и даты."""
+        self.round_trip('ndjson')
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        """Выгрузка и загрузка CSV сохраняют данные и даты."""
+        self.round_trip('csv')
+        self.assert_restored()
+
+    def test_new_posts_after_import(self):
+        """После загрузки с явными id новые посты создаются."""
+        self.round_trip('ndjson')
+        post = Post.objects.create(text='Новый', author=self.author)
+        self.assertGreater(post.pk, self.post.pk)
+
+    def test_taken_ids_abort_import(self):
+        """Загрузка в базу, где id уже заняты, не начинается."""
+        for model in ('posts', 'comments'):
+            path = self.export(model, 'ndjson')
+            with self.subTest(model=model):
+                with self.assertRaisesMessage(CommandError, 'уже заняты'):
+                    self.run_command('import_posts', path, model=model)
+        self.assertEqual(Post.objects.get().text, 'Старый пост про котиков')
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_existing_follows_skipped(self):
+        """Уже существующие подписки считаются пропущенными."""
+        path = self.export('follows', 'ndjson')
+        out = io.StringIO()
+        call_command('import_posts', path, model='follows', no_repair=True,
+                     stdout=out)
+        self.assertIn('Загружено строк: 0, пропущено: 1', out.getvalue())
+        self.assertEqual(Follow.objects.count(), 1)
@@ -6,13 +6,15 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 from random import randint
 from yatube.settings import NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT
 
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow
 from posts.forms import PostForm, CommentForm
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -57,6 +59,7 @@ class PostViewTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostViewTest.user)
 
@@ -330,3 +333,65 @@ class PaginatorViewsTest(TestCase):
                     self.assertEqual(
                         len(response.context['page_obj']), meaning
                     )
+
+
+class CommentsViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            text='Текстовый текст',
+            author=cls.user,
+            group=cls.group
+        )
+        cls.url = reverse('posts:post_detail',
+                          kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        # Страницы прошлых тестов остаются в кеше.
+        cache.clear()
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        commentators = [
+            User.objects.create_user(username=f'Commentator{start + i}')
+            for i in range(count)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text=f'Коммент {i}')
+            for i, author in enumerate(commentators)
+        )
+        # bulk_create не шлёт сигналов, кеш страниц сбрасываем сами.
+        cache.clear()
+
+    def test_comments_constant_queries(self):
+        """Число запросов страницы поста не растёт с числом комментариев."""
+        client = Client()
+        self.add_comments(1)
+        with CaptureQueriesContext(connection) as few:
+            client.get(self.url)
+        self.add_comments(30)
+        with CaptureQueriesContext(connection) as many:
+            client.get(self.url)
+        self.assertEqual(len(few), len(many))
+
+    @override_settings(COMMENTS_PER_PAGE=3)
+    def test_comments_load_more(self):
+        """Комментарии подгружаются порциями по курсору."""
+        self.add_comments(5)
+        response = Client().get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Коммент 0', 'Коммент 1', 'Коммент 2'])
+        self.assertContains(response, f'?cursor={comments.next_cursor}')
+        response = Client().get(self.url, {'cursor': comments.next_cursor})
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Коммент 3', 'Коммент 4'])
@@ -0,0 +1,193 @@
+"""
+Миниатюры картинок постов строятся вне цикла запроса.
+
+Представления ставят задания в ThumbnailJob, а команда
+process_thumbnails выполняет их пулом потоков. Пока миниатюра
+не готова, {% thumbnail %} отдаёт исходную картинку.
+
+Лента и страница поста оборачивают рендер в prefetched(): kvstore
+читается одним запросом на страницу, а не по запросу на каждую
+миниатюру, и задания ставятся одной вставкой.
+"""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from posts import cards
+from posts.models import ThumbnailJob
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+CARD_GEOMETRY = '960x339'
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+# Варианты картинки для srcset: ширина и геометрия с пропорциями карточки.
+VARIANT_WIDTHS = (320, 640, 960)
+# WebP, если Pillow собран с libwebp. AVIF Pillow пока не пишет.
+VARIANT_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+VARIANTS = tuple(
+    (width, '%dx%d' % (width, round(width * 339 / 960)),
+     {**CARD_OPTIONS, 'format': VARIANT_FORMAT})
+    for width in VARIANT_WIDTHS
+)
+# Миниатюры, которые выводят шаблоны постов.
+PRESETS = ((CARD_GEOMETRY, CARD_OPTIONS),) + tuple(
+    (geometry, options) for width, geometry, options in VARIANTS)
+
+
+def job_options(options):
+    return json.dumps(options, sort_keys=True)
+
+
+def enqueue(image, presets=PRESETS):
+    """Ставит в очередь миниатюры картинки, повторы пропускаются."""
+    if not image:
+        return
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(source=image.name, geometry=geometry,
+                      options=job_options(options))
+         for geometry, options in presets),
+        ignore_conflicts=True,
+    )
+
+
+def kvstore_key(thumbnail):
+    return add_prefix(thumbnail.key, 'image')
+
+
+@contextmanager
+def prefetched(images, presets=PRESETS):
+    """
+    Готовые миниатюры картинок из kvstore одним запросом, для
+    недостающих ставятся задания, которых ещё нет в очереди. Внутри
+    блока бэкенд отвечает по собранному словарю и в БД не ходит.
+    """
+    backend = QueuedThumbnailBackend()
+    wanted = {}
+    for image in images:
+        if not image:
+            continue
+        source = ImageFile(image)
+        for geometry, options in presets:
+            thumbnail = backend.thumbnail_file(source, geometry, options)
+            wanted[kvstore_key(thumbnail)] = (source, geometry, options)
+    known = dict(getattr(_local, 'known', None) or {})
+    if wanted:
+        known.update(lookup(wanted))
+        enqueue_missing([
+            (source.name, geometry, job_options(options))
+            for key, (source, geometry, options) in wanted.items()
+            if known[key] is None
+        ])
+    saved = getattr(_local, 'known', None)
+    _local.known = known
+    try:
+        yield
+    finally:
+        _local.known = saved
+
+
+def enqueue_missing(jobs):
+    """Ставит в очередь задания (source, geometry, options), которых нет."""
+    if not jobs:
+        return
+    queued = set(
+        ThumbnailJob.objects
+        .filter(source__in={source for source, _, _ in jobs})
+        .values_list('source', 'geometry', 'options'))
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(source=source, geometry=geometry, options=options)
+         for source, geometry, options in jobs
+         if (source, geometry, options) not in queued),
+        ignore_conflicts=True,
+    )
+
+
+def lookup(keys):
+    """Ключ kvstore -> ImageFile миниатюры или None."""
+    kv_cache = default.kvstore.cache
+    raw = {
+        key: value for key, value in kv_cache.get_many(list(keys)).items()
+        if isinstance(value, str)
+    }
+    missing = [key for key in keys if key not in raw]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing)
+            .values_list('key', 'value'))
+        kv_cache.set_many(stored, settings.THUMBNAIL_CACHE_TIMEOUT)
+        raw.update(stored)
+    return {
+        key: deserialize_image_file(raw[key]) if key in raw else None
+        for key in keys
+    }
+
+
+def get_thumbnail(image, geometry, options):
+    """Готовая миниатюра или None, если она ещё в очереди."""
+    thumbnail = default.backend.get_thumbnail(image, geometry, **options)
+    if thumbnail.name == image.name:
+        return None
+    return thumbnail
+
+
+def generate(job):
+    """Строит миниатюру задания и сбрасывает карточки её постов."""
+    ThumbnailBackend().get_thumbnail(
+        job.source, job.geometry, **json.loads(job.options))
+    cards.touch(image=job.source)
+
+
+class QueuedThumbnailBackend(ThumbnailBackend):
+    """
+    Бэкенд sorl-thumbnail, который не строит миниатюры в запросе.
+    Готовая миниатюра берётся из kvstore, иначе ставится задание
+    и возвращается исходный файл.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        thumbnail = self.thumbnail_file(source, geometry_string, options)
+        known = getattr(_local, 'known', None) or {}
+        if kvstore_key(thumbnail) in known:
+            return known[kvstore_key(thumbnail)] or source
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        # kvstore запоминает и промахи, а миниатюру запишет другой
+        # процесс: промах забываем, чтобы её увидеть.
+        kv_cache = getattr(default.kvstore, 'cache', None)
+        if kv_cache is not None:
+            kv_cache.delete(add_prefix(thumbnail.key, 'image'))
+        enqueue(source, ((geometry_string, options),))
+        return source
+
+    def thumbnail_file(self, source, geometry_string, options):
+        """Файл миниатюры, под которым её запишет ThumbnailBackend."""
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.full_options(source, dict(options)))
+        return ImageFile(name, default.storage)
+
+    def full_options(self, source, options):
+        """Параметры с умолчаниями, как их дополняет ThumbnailBackend."""
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
@@ -0,0 +1,188 @@
+"""
+Лента подписок с раздачей при записи (fan-out-on-write).
+
+Новый пост сразу раскладывается по TimelineEntry всех подписчиков автора,
+поэтому чтение /follow/ — это диапазон по индексу (user, pub_date).
+Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT («горячие»),
+не раскладываются: их посты подмешиваются в ленту при чтении.
+Остывшего автора раскладывает по лентам команда
+process_timeline_backfills, до тех пор он остаётся горячим.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from posts import feeds
+from posts.models import Follow, Post, TimelineBackfill, TimelineEntry
+from posts.paginators import MergedCursorPaginator, paginate
+
+HOT_AUTHORS_CACHE_KEY = 'posts:timeline:hot_authors'
+BATCH_SIZE = 1000
+ENTRY_ORDERING = ('-pub_date', '-post_id')
+
+
+def _bulk_insert(entries):
+    # Django 2.2 не ограничивает явный batch_size пределами СУБД,
+    # а SQLite не принимает больше 500 строк в одной вставке.
+    fields = [field.name for field in TimelineEntry._meta.concrete_fields]
+    batch_size = min(
+        BATCH_SIZE, connection.ops.bulk_batch_size(fields, []) or BATCH_SIZE)
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=batch_size, ignore_conflicts=True)
+
+
+def followers_count(author):
+    return Follow.objects.filter(author=author).count()
+
+
+def is_hot(author):
+    return (followers_count(author) > settings.TIMELINE_FANOUT_LIMIT
+            or TimelineBackfill.objects.filter(author=author).exists())
+
+
+def load_hot_author_ids():
+    hot = (
+        Follow.objects.values('author')
+        .annotate(followers=Count('id'))
+        .filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+    # Остывшие, но ещё не разложенные авторы тоже читаются на лету.
+    return set(hot.union(
+        TimelineBackfill.objects.values_list('author', flat=True)))
+
+
+def hot_author_ids():
+    """
+    Множество id горячих авторов. С общим кешем хранится до смены
+    состава, но не дольше TIMELINE_HOT_AUTHORS_TIMEOUT, иначе
+    читается из базы на каждый запрос.
+    """
+    timeout = settings.TIMELINE_HOT_AUTHORS_TIMEOUT
+    if not timeout:
+        return load_hot_author_ids()
+    ids = cache.get(HOT_AUTHORS_CACHE_KEY)
+    if ids is None:
+        ids = load_hot_author_ids()
+        cache.set(HOT_AUTHORS_CACHE_KEY, ids, timeout)
+    return ids
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_hot(post.author):
+        return
+    followers = Follow.objects.filter(
+        author=post.author).values_list('user', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def _backfill(user_id, author, since=None):
+    posts = Post.objects.filter(author=author)
+    if since is not None:
+        posts = posts.filter(pub_date__gte=since)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.values_list('id', 'pub_date').iterator()
+    )
+
+
+def backfill(user, author):
+    """Добавляет посты автора в ленту нового подписчика."""
+    if is_hot(author):
+        return
+    _backfill(user.pk, author)
+
+
+def rebuild():
+    """
+    Раскладывает посты по лентам всех подписок заново.
+    Нужна после загрузки данных мимо сигналов.
+    """
+    TimelineBackfill.objects.all().delete()
+    cache.delete(HOT_AUTHORS_CACHE_KEY)
+    hot = hot_author_ids()
+    follows = Follow.objects.exclude(author__in=hot).values_list(
+        'user', 'author')
+    for user_id, author_id in follows.iterator():
+        posts = Post.objects.filter(
+            author_id=author_id).values_list('id', 'pub_date')
+        _bulk_insert(
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        )
+
+
+def prune(user, author):
+    """Убирает посты автора из ленты отписавшегося."""
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def follow_added(follow):
+    backfill(follow.user, follow.author)
+    if followers_count(follow.author) == settings.TIMELINE_FANOUT_LIMIT + 1:
+        cache.delete(HOT_AUTHORS_CACHE_KEY)
+
+
+def follow_removed(follow):
+    prune(follow.user, follow.author)
+    if followers_count(follow.author) == settings.TIMELINE_FANOUT_LIMIT:
+        # Автор перестал быть горячим. Разложить его посты по лентам
+        # оставшихся подписчиков — долго для запроса, это сделает
+        # process_timeline_backfills, а пока посты подмешиваются.
+        TimelineBackfill.objects.get_or_create(author=follow.author)
+        cache.delete(HOT_AUTHORS_CACHE_KEY)
+
+
+def process_backfill(pending):
+    """Раскладывает посты остывшего автора по лентам подписчиков."""
+    author = pending.author
+    started = timezone.now()
+    followers = Follow.objects.filter(
+        author=author).values_list('user', flat=True)
+    hot = followers.count() > settings.TIMELINE_FANOUT_LIMIT
+    if not hot:
+        for user_id in followers.iterator():
+            _backfill(user_id, author)
+    pending.delete()
+    cache.delete(HOT_AUTHORS_CACHE_KEY)
+    if not hot:
+        # Посты, опубликованные за время раскладки, fan_out пропустил.
+        for user_id in followers.iterator():
+            _backfill(user_id, author, since=started)
+
+
+def get_page(request, user):
+    """Страница ленты подписок пользователя."""
+    entries = TimelineEntry.objects.filter(user=user)
+    hot_ids = hot_author_ids()
+    hot = []
+    if hot_ids:
+        hot = list(Follow.objects.filter(
+            user=user, author__in=hot_ids).values_list('author', flat=True))
+    if hot:
+        # Лента и посты каждого горячего автора читаются диапазоном
+        # своего индекса и сливаются: OR или author__in в одном запросе
+        # сортировали бы все подходящие посты целиком.
+        sources = [
+            (feeds.timeline_entries(entries), ENTRY_ORDERING,
+             lambda entry: entry.post),
+        ] + [
+            (feeds.posts(Post.objects.filter(author=author_id)),
+             feeds.ORDERING, None)
+            for author_id in hot
+        ]
+        posts = Post.objects.filter(
+            Q(id__in=entries.values('post')) | Q(author__in=hot))
+        return paginate(
+            request, feeds.posts(posts),
+            paginator_class=MergedCursorPaginator, sources=sources)
+    entries = feeds.timeline_entries(entries)
+    page = paginate(request, entries, ordering=ENTRY_ORDERING)
+    page.object_list = [entry.post for entry in page.object_list]
+    return page
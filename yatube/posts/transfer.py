@@ -0,0 +1,228 @@
+"""
+Перенос постов, комментариев и подписок в NDJSON и CSV.
+
+Экспорт и импорт идут потоком пачками по batch_size строк, поэтому
+память не растёт с размером выгрузки. В памяти держатся только
+словари username -> id и slug -> id. Посты и комментарии сохраняют
+свои id и даты, так что комментарии ссылаются на посты по id;
+поэтому загрузка, где id уже заняты в базе, не начинается.
+"""
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils.dateparse import parse_datetime
+
+from posts import feed_versions, search, timeline
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FORMATS = ('ndjson', 'csv')
+# Поля выгрузки и пути к ним в values().
+EXPORT_FIELDS = {
+    'posts': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comments': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follows': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_records(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def export_records(model_name, batch_size):
+    model, fields = EXPORT_FIELDS[model_name]
+    rows = model.objects.order_by('pk').values_list(*fields.values())
+    for row in rows.iterator(chunk_size=batch_size):
+        yield dict(zip(fields, row))
+
+
+def write_records(stream, records, file_format, model_name):
+    fields = list(EXPORT_FIELDS[model_name][1])
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, fields)
+        writer.writeheader()
+    count = 0
+    for record in records:
+        for name, value in record.items():
+            if hasattr(value, 'isoformat'):
+                record[name] = value.isoformat()
+            elif value is None and file_format == 'csv':
+                record[name] = ''
+        if file_format == 'csv':
+            writer.writerow(record)
+        else:
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+@contextmanager
+def preserved_dates(*models):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты записей."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def repair(stdout):
+    """bulk_create не шлёт сигналы: досчитываем всё, что на них."""
+    call_command('recount_counters', stdout=stdout)
+    timeline.rebuild()
+    search.get_backend().rebuild()
+    feed_versions.forget_all()
+
+
+class KeyMap:
+    """
+    Словарь натуральный ключ -> id. Недостающие строки создаются
+    одной пачкой на всю пачку записей.
+    """
+
+    def __init__(self, model, field, defaults):
+        self.model = model
+        self.field = field
+        self.defaults = defaults
+        self.ids = dict(
+            model.objects.values_list(field, 'pk').iterator())
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if missing:
+            self.model.objects.bulk_create(
+                (self.model(**{self.field: key, **self.defaults(key)})
+                 for key in missing),
+                ignore_conflicts=True,
+            )
+            self.ids.update(
+                self.model.objects.filter(**{f'{self.field}__in': missing})
+                .values_list(self.field, 'pk'))
+
+    def __getitem__(self, key):
+        return self.ids[key] if key else None
+
+
+def user_map():
+    return KeyMap(
+        User, 'username',
+        lambda username: {'password': '!'})
+
+
+def group_map():
+    return KeyMap(
+        Group, 'slug',
+        lambda slug: {'title': slug, 'description': ''})
+
+
+def taken_ids(model, records, batch_size):
+    """id из выгрузки, которые в базе уже заняты другими строками."""
+    taken = []
+    for batch in batches(records, batch_size):
+        ids = [int(record['id']) for record in batch if record.get('id')]
+        taken.extend(
+            model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    return taken
+
+
+def build_posts(records, users, groups):
+    users.resolve([record['author'] for record in records])
+    groups.resolve([record.get('group') for record in records])
+    posts = []
+    for record in records:
+        pub_date = parse_datetime(record['pub_date'])
+        posts.append(Post(
+            id=record.get('id') or None,
+            text=record['text'],
+            pub_date=pub_date,
+            updated=pub_date,
+            author_id=users[record['author']],
+            group_id=groups[record.get('group')],
+            image=record.get('image') or '',
+        ))
+    return posts
+
+
+def build_comments(records, users, groups):
+    users.resolve([record['author'] for record in records])
+    return [
+        Comment(
+            id=record.get('id') or None,
+            post_id=int(record['post']),
+            author_id=users[record['author']],
+            text=record['text'],
+            created=parse_datetime(record['created']),
+        )
+        for record in records
+    ]
+
+
+def build_follows(records, users, groups):
+    users.resolve(
+        [record['user'] for record in records]
+        + [record['author'] for record in records])
+    pairs = {
+        (users[record['user']], users[record['author']])
+        for record in records if record['user'] != record['author']
+    }
+    existing = set(
+        Follow.objects.filter(
+            user_id__in={user for user, _ in pairs},
+            author_id__in={author for _, author in pairs})
+        .values_list('user_id', 'author_id'))
+    return [
+        Follow(user_id=user, author_id=author)
+        for user, author in pairs - existing
+    ]
+
+
+# Модели, строки которых загружаются со своими id.
+KEEP_IDS = {'posts': Post, 'comments': Comment}
+BUILDERS = {
+    'posts': build_posts,
+    'comments': build_comments,
+    'follows': build_follows,
+}
@@ -1,30 +1,29 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from core.db.routers import read_only
 from posts.forms import PostForm, CommentForm
 from posts.models import Group, Post, User, Follow
-
-from yatube.settings import NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT
+from posts.counters import get_counters
+from posts.paginators import paginate
+from posts import feeds, index_cache, thumbnails, timeline
+from posts.search import get_backend as get_search_backend
 
 
+@read_only
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
-    paginator = Paginator(posts, NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = index_cache.get_page(request)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_only
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    paginator = Paginator(posts, NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, feeds.posts(group.posts.all()))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -32,32 +31,42 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_only
 def profile(request, username):
     user = get_object_or_404(User, username=username)
-    posts = user.posts.select_related('group')
-    paginator = Paginator(posts, NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, feeds.posts(user.posts.all()))
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=user).exists()
     context = {
         'page_obj': page_obj,
         'author': user,
+        'counters': get_counters(user),
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_only
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        id=post_id
+    )
     form = CommentForm()
-    comments = post.comment.all
+    comments = paginate(
+        request,
+        post.comment.select_related('author'),
+        per_page=settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'id')
+    )
     context = {
         'comments': comments,
         'post': post,
+        'author_counters': get_counters(post.author),
         'form': form
     }
-    return render(request, 'posts/post_detail.html', context)
+    with thumbnails.prefetched([post.image]):
+        return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
@@ -68,6 +77,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        index_cache.write_through()
         return redirect('posts:profile', username=post.author)
     context = {
         'form': form
@@ -87,6 +97,9 @@ def post_edit(request, post_id):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post.image)
+        index_cache.write_through()
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -98,7 +111,9 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    # Автор и группа нужны сигналу, чтобы сбросить версии лент поста.
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -109,17 +124,30 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_only
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = timeline.get_page(request, request.user)
     context = {
         'page_obj': page_obj
     }
     return render(request, 'posts/follow.html', context)
 
 
+@read_only
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = get_search_backend().search(
+            query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    with thumbnails.prefetched([post.image for post in page_obj or ()]):
+        return render(request, 'posts/search.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     author = User.objects.get(username=username)
@@ -0,0 +1,13 @@
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(
+    get_wsgi_application(), settings.ASGI_THREADS,
+    max_body_size=settings.ASGI_MAX_BODY_SIZE,
+    spool_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '+p-z7#u$g#dzrndak2y^z@ld_&h5zzedqc&&)gne0x(=fj6oso'
@@ -34,6 +35,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -48,7 +52,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,13 +68,70 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Сколько запросов одновременно выполняет yatube.asgi: Django 2.2
+# синхронный, и каждый запрос занимает поток пула (core.asgi).
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
+# Предел тела запроса у yatube.asgi, байты: больше — ответ 413.
+ASGI_MAX_BODY_SIZE = int(
+    os.getenv('YATUBE_ASGI_MAX_BODY_SIZE', 20 * 1024 * 1024))
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+# База выбирается окружением: YATUBE_DB = sqlite | postgres.
+# Обе обёртки лежат в core.db.backends: SQLite с PRAGMA для одиночной
+# установки, PostgreSQL с пулом соединений (нужен psycopg2).
+DATABASE_ENGINES = {
+    'sqlite': 'core.db.backends.sqlite3',
+    'postgres': 'core.db.backends.postgresql',
 }
+DATABASE = os.getenv('YATUBE_DB', 'sqlite')
+if DATABASE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': DATABASE_ENGINES[DATABASE],
+            'NAME': os.getenv('YATUBE_DB_NAME', 'yatube'),
+            'USER': os.getenv('YATUBE_DB_USER', 'yatube'),
+            'PASSWORD': os.getenv('YATUBE_DB_PASSWORD', ''),
+            'HOST': os.getenv('YATUBE_DB_HOST', 'localhost'),
+            'PORT': os.getenv('YATUBE_DB_PORT', '5432'),
+            # Соединение живёт между запросами, а закрытое
+            # возвращается в пул процесса.
+            'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 60)),
+            'POOL_MIN_SIZE': 1,
+            # Потоку сверх POOL_MAX_SIZE соединение ждёт POOL_TIMEOUT
+            # секунд; пул не меньше ASGI_THREADS и потоков WSGI-сервера.
+            'POOL_MAX_SIZE': int(os.getenv('YATUBE_DB_POOL_SIZE', 20)),
+            'POOL_TIMEOUT': float(os.getenv('YATUBE_DB_POOL_TIMEOUT', 30)),
+        }
+    }
+    # YATUBE_DB_REPLICA_HOSTS=host1,host2 — реплики для чтения лент.
+    for number, host in enumerate(
+            filter(None, os.getenv('YATUBE_DB_REPLICA_HOSTS', '').split(',')),
+            start=1):
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DATABASE_ENGINES['sqlite'],
+            'NAME': os.getenv(
+                'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
+    }
+    # YATUBE_DB_READ_CONNECTION=1 — чтения лент через отдельное
+    # соединение только для чтения (core.db.routers).
+    if os.getenv('YATUBE_DB_READ_CONNECTION'):
+        DATABASES['read'] = {
+            **DATABASES['default'],
+            'PRAGMAS': {'query_only': 'ON'},
+            'TEST': {'MIRROR': 'default'},
+        }
+# Базы для чтения лент (core.db.routers).
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# Сколько секунд после записи браузер читает только из default.
+REPLICA_PIN_SECONDS = 5
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +166,50 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 NUMBER_OF_POSTS_PER_PAGE_BY_DEFAULT = 10
+# С какого числа строк таблицы нумерованная пагинация берёт его
+# из статистики СУБД, а не из COUNT(*).
+PAGINATOR_ESTIMATE_THRESHOLD = 100000
+COMMENTS_PER_PAGE = 50
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, а подмешиваются в ленту подписок при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Время жизни первой страницы главной ленты в кеше, секунды.
+INDEX_CACHE_TIMEOUT = 20
+# Страницы, которые анонимы получают целиком из кеша
+# (core.middleware.AnonymousPageCacheMiddleware), и срок их жизни.
+# Значение — область кеша страницы (core.page_cache), в неё
+# подставляются аргументы адреса. Правки моделей сбрасывают кеш
+# затронутых областей сразу, срок страхует от правок мимо сигналов
+# (bulk_create, update) и ограничивает отставание счётчиков автора
+# на странице поста.
+PAGE_CACHE_VIEWS = {
+    'posts:index': 'feed',
+    'posts:group_list': 'feed',
+    'posts:profile': 'author:{username}',
+    'posts:post_detail': 'post:{post_id}',
+}
+PAGE_CACHE_TIMEOUT = 60
+# Время жизни отрендеренной карточки поста в кеше, секунды.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Бэкенд поиска по постам; None — выбрать по СУБД (posts.search).
+SEARCH_BACKEND = None
+# Миниатюры строит команда process_thumbnails, а не запрос.
+THUMBNAIL_BACKEND = 'posts.thumbnails.QueuedThumbnailBackend'
+
+# Предельное число SQL-запросов на представление. Превышение пишется
+# в лог yatube.metrics, а при QUERY_BUDGET_STRICT поднимает исключение;
+# manage.py test включает строгий режим (core.test_runner).
+# Лента подписок тратит ещё запрос на каждого горячего автора
+# в подписках сверх первого (posts.timeline).
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_list': 6,
+    'posts:profile': 8,
+    'posts:post_detail': 10,
+    'posts:follow_index': 6,
+}
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.test_runner.TestRunner'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -114,8 +219,64 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+# Кеш выбирается окружением: YATUBE_CACHE = locmem | file | redis.
+# file — общий для всех процессов машины кеш в каталоге
+# YATUBE_CACHE_LOCATION, redis требует пакета django-redis.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'core.cache_backends.SharedFileCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+CACHE_LOCATIONS = {
+    'file': os.path.join(tempfile.gettempdir(), 'yatube_cache'),
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+CACHE_BACKEND = os.getenv('YATUBE_CACHE', 'locmem')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', CACHE_LOCATIONS.get(CACHE_BACKEND, '')),
+        'KEY_PREFIX': 'yatube',
+        # Новая версия после выкладки делает недостижимыми старые ключи.
+        'VERSION': int(os.getenv('YATUBE_CACHE_VERSION', 1)),
     }
 }
+# Сколько секунд после срока фрагмент отдаётся устаревшим,
+# пока один запрос его пересчитывает (core.caching).
+CACHE_STALE_TIMEOUT = 60
+# Время жизни блокировки пересчёта, секунды.
+CACHE_LOCK_TIMEOUT = 5
+# У file и redis кеш общий для всех процессов, у locmem — свой
+# в каждом. Сессии и пользователь запроса кешируются только в общем:
+# иначе сброс после смены пароля и отложенные правки сессии видит
+# лишь один процесс.
+SHARED_CACHE = CACHE_BACKEND in ('file', 'redis')
+# Сессии выбираются окружением: YATUBE_SESSION = db | cached_db |
+# signed_cookies. cached_db читает сессию из кеша и пишет её в базу
+# не чаще раза в SESSION_WRITE_BEHIND_SECONDS (core.sessions),
+# signed_cookies хранит сессию в подписанной cookie без базы, но
+# её нельзя отозвать на сервере, а размер ограничен 4 КБ.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'core.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[
+    os.getenv('YATUBE_SESSION', 'cached_db' if SHARED_CACHE else 'db')]
+SESSION_WRITE_BEHIND_SECONDS = 60
+# С общим кешем пользователь запроса берётся из него (core.auth_backends).
+AUTHENTICATION_BACKENDS = [
+    'core.auth_backends.CachedModelBackend' if SHARED_CACHE
+    else 'django.contrib.auth.backends.ModelBackend'
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+# Множество горячих авторов ленты подписок (posts.timeline) кешируется
+# только в общем кеше: сброс в одном процессе locmem остальные не
+# видят и не подмешивали бы посты нового горячего автора. Срок
+# страхует от гонки пересчёта со сбросом.
+TIMELINE_HOT_AUTHORS_TIMEOUT = 60 if SHARED_CACHE else 0
+# Срок версии ленты API (posts.feed_versions), секунды. Без общего
+# кеша сброс виден только своему процессу, остальные отдают 304 до
+# конца срока.
+FEED_VERSION_TIMEOUT = 60 * 10 if SHARED_CACHE else 15
@@ -10,6 +10,7 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.url', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
 ]
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'